@@ -0,0 +1,58 @@
+'''
+Benchmark of the parallel csv loader. A synthetic xy csv file is written
+and parsed with an increasing number of worker processes, the speedup
+relatively to one worker is printed for each worker count.
+
+Usage: python bench_csv_loader.py [n_rows] [max_workers]
+'''
+
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import multiprocessing
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'source'))
+
+import csv_loader
+
+from synthetic import write_synthetic_csv
+
+
+def time_load(file_path, n_workers, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        csv_loader.load_csv(file_path, n_workers=n_workers, chunk_size=16 * 2 ** 20)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    n_rows = int(float(sys.argv[1])) if len(sys.argv) > 1 else 10 ** 7
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else multiprocessing.cpu_count()
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        file_path = os.path.join(tmp_dir, 'bench.csv')
+        write_synthetic_csv(file_path, n_rows)
+        size_mb = os.path.getsize(file_path) / 2.0 ** 20
+        print('{0:d} rows, {1:.1f} MB, {2:d} cores'.format(n_rows, size_mb, multiprocessing.cpu_count()))
+        print('{0:>8} {1:>10} {2:>10} {3:>8}'.format('workers', 'time, s', 'MB/s', 'speedup'))
+
+        worker_counts = [2 ** i for i in range(max_workers.bit_length()) if 2 ** i < max_workers]
+        worker_counts.append(max_workers)
+        reference = None
+        for n_workers in worker_counts:
+            elapsed = time_load(file_path, n_workers)
+            reference = reference or elapsed
+            print('{0:>8d} {1:>10.3f} {2:>10.1f} {3:>8.2f}'.format(n_workers, elapsed, size_mb / elapsed, reference / elapsed))
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+'''
+Benchmark suite of the hot paths of the application: csv parsing, table
+construction, offscreen rendering and export of the chart values. It runs
+headless (offscreen vtk render window, no qt window) on synthetic data and
+writes machine readable results that can be compared between commits.
+
+Usage:
+    python bench_suite.py [--points 1e3,1e5] [--series 1,10] [--output results.json]
+    python bench_suite.py --compare base.json new.json
+'''
+
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'source'))
+
+from PyQt4 import QtCore
+
+import csv_loader
+import derived
+import table_export
+
+from vtk_chart import VTKChartWidget
+
+from synthetic import make_series, write_csv
+
+
+default_points = [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7, 10 ** 8]
+default_series = [1, 10, 100, 500]
+
+
+def best_time(function, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        function()
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def git_revision():
+    try:
+        root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=root).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_case(chart, tmp_dir, n_points, n_series, args):
+    results = {}
+    x, ys = make_series(n_points, n_series)
+    n_values = n_points * (n_series + 1)
+
+    if n_values <= args.max_csv_values:
+        csv_path = os.path.join(tmp_dir, 'bench.csv')
+        write_csv(csv_path, x, ys)
+        results['parse_csv'] = best_time(
+            lambda: csv_loader.load_csv(csv_path, n_columns=n_series + 1), args.repeat)
+        os.remove(csv_path)
+
+    results['build_table'] = best_time(
+        lambda: chart.set_multiple_xy_data(x, ys, 'bench'), args.repeat)
+    # same series again, the plots are reused
+    results['replace_data'] = best_time(
+        lambda: chart.update_data(x, ys, 'bench'), args.repeat)
+
+    results['render_full'] = best_time(chart.render_now, args.repeat)
+
+    for operation in derived.operations:
+        results['derived_' + operation] = best_time(
+            lambda: derived.compute(operation, x, ys[0]), args.repeat)
+
+    def render_zoom():
+        chart.update_decimation((x[n_points // 4], x[n_points // 2]))
+        chart.render_now()
+    results['render_zoom'] = best_time(render_zoom, args.repeat)
+
+    def render_density():
+        chart.update_decimation()
+        chart.render_now()
+    chart.set_scatter_mode(True)
+    results['render_density'] = best_time(render_density, args.repeat)
+    chart.set_scatter_mode(False)
+
+    if n_values <= args.max_table_values:
+        results['get_values_as_table'] = best_time(chart.get_values_as_table, args.repeat)
+
+    npy_path = os.path.join(tmp_dir, 'bench.npy')
+    names, columns = chart.get_columns()
+    results['export_npy'] = best_time(
+        lambda: table_export.export_columns(npy_path, names, columns), args.repeat)
+    os.remove(npy_path)
+    return results
+
+
+def parse_sizes(text):
+    return [int(float(v)) for v in text.split(',') if v]
+
+
+def run(args):
+    app = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication(sys.argv)
+    chart = VTKChartWidget(None)
+    tmp_dir = tempfile.mkdtemp()
+
+    records = []
+    try:
+        for n_points in parse_sizes(args.points):
+            for n_series in parse_sizes(args.series):
+                if n_points * n_series > args.max_values:
+                    continue
+                timings = run_case(chart, tmp_dir, n_points, n_series, args)
+                app.processEvents()
+                for case, seconds in sorted(timings.items()):
+                    records.append({'case': case,
+                                    'n_points': n_points,
+                                    'n_series': n_series,
+                                    'seconds': seconds})
+                    sys.stderr.write('{0:<22} {1:>10d} pts {2:>4d} series {3:>10.4f} s\n'.format(
+                        case, n_points, n_series, seconds))
+    finally:
+        shutil.rmtree(tmp_dir)
+
+    output = {'revision': git_revision(),
+              'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+              'platform': platform.platform(),
+              'python': platform.python_version(),
+              'repeat': args.repeat,
+              'results': records}
+    text = json.dumps(output, indent=1, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+def compare(base_path, new_path):
+    '''
+    Prints the ratio new / base of the timings common to both result files.
+    '''
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    def key(record):
+        return record['case'], record['n_points'], record['n_series']
+    base_times = dict((key(r), r['seconds']) for r in base['results'])
+
+    print('base: {0}  new: {1}'.format(base.get('revision'), new.get('revision')))
+    print('{0:<22} {1:>10} {2:>6} {3:>10} {4:>10} {5:>7}'.format(
+        'case', 'points', 'series', 'base, s', 'new, s', 'ratio'))
+    for record in new['results']:
+        if key(record) not in base_times:
+            continue
+        base_time = base_times[key(record)]
+        ratio = record['seconds'] / base_time if base_time else float('nan')
+        print('{0:<22} {1:>10d} {2:>6d} {3:>10.4f} {4:>10.4f} {5:>7.2f}'.format(
+            record['case'], record['n_points'], record['n_series'], base_time, record['seconds'], ratio))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--points', default=','.join(str(n) for n in default_points),
+                        help='comma separated numbers of points per series')
+    parser.add_argument('--series', default=','.join(str(n) for n in default_series),
+                        help='comma separated numbers of series')
+    parser.add_argument('--max-values', type=float, default=2e8,
+                        help='skip the cases with more points * series')
+    parser.add_argument('--max-csv-values', type=float, default=2e7,
+                        help='largest case for which a csv file is written and parsed')
+    parser.add_argument('--max-table-values', type=float, default=1e7,
+                        help='largest case for which get_values_as_table is timed')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='json file of results, stdout by default')
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'),
+                        help='compare two result files instead of running')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+    else:
+        run(args)
+
+
+if __name__ == '__main__':
+    main()
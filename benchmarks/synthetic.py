@@ -0,0 +1,43 @@
+'''
+Generator of synthetic xy data used by the benchmarks: noisy sines of
+various periods sampled on a common uniform X.
+'''
+
+
+import numpy as np
+
+
+def make_series(n_points, n_series=1, seed=0):
+    '''
+    Returns x and the list of n_series y arrays of n_points float64 values.
+    '''
+    rng = np.random.RandomState(seed)
+    x = np.arange(n_points, dtype=np.float64) * 1e-3
+    ys = []
+    for i in range(n_series):
+        period = 1.0 + 10.0 * rng.rand()
+        y = np.sin(x * (2 * np.pi / period)) + 0.1 * rng.standard_normal(n_points)
+        ys.append(y)
+    return x, ys
+
+
+def write_csv(file_path, x, ys, delimiter=',', block_rows=10 ** 6):
+    with open(file_path, 'wb') as f:
+        for first in range(0, len(x), block_rows):
+            last = min(first + block_rows, len(x))
+            block = np.column_stack([x[first:last]] + [y[first:last] for y in ys])
+            np.savetxt(f, block, fmt='%.9g', delimiter=delimiter)
+
+
+def write_synthetic_csv(file_path, n_rows, n_series=1, block_rows=10 ** 6):
+    '''
+    Writes a csv file of n_rows lines without building all the values in
+    memory at once.
+    '''
+    with open(file_path, 'wb') as f:
+        for first in range(0, n_rows, block_rows):
+            n_block = min(block_rows, n_rows - first)
+            x, ys = make_series(n_block, n_series, seed=first)
+            x += first * 1e-3
+            block = np.column_stack([x] + ys)
+            np.savetxt(f, block, fmt='%.9g', delimiter=',')
@@ -0,0 +1,179 @@
+'''
+Module with the native columnar binary format of the application (.vcol).
+
+Layout of a file:
+    16 bytes     magic b'VCOL', format version (uint8), 3 padding bytes,
+                 length of the json header (uint64, little endian)
+    json header  {"n_rows": n, "columns": [{"name", "dtype", "offset"}, ...]}
+    columns      contiguous blocks of n values each, starting at offsets
+                 aligned on 64 bytes
+
+Columns are memory mapped when a file is opened, so opening a file costs
+no memory until the pages of the columns are read.
+
+Usage as a converter: python columnar_format.py input.csv output.vcol [n_columns]
+
+The number of columns is sniffed from the csv file when not given.
+'''
+
+
+import os
+import sys
+import json
+import struct
+import shutil
+
+import numpy as np
+
+import csv_loader
+
+
+MAGIC = b'VCOL'
+VERSION = 1
+ALIGNMENT = 64
+
+_prefix = struct.Struct('<4sB3xQ')
+
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def is_columnar(file_path):
+    with open(file_path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def _layout(names, dtypes, n_rows):
+    '''
+    Returns the header bytes and the offsets of the column blocks.
+    '''
+    # offsets depend on the header length which depends on the offsets,
+    # the header is padded until both are consistent
+    header_size = 0
+    while True:
+        offset = _align(_prefix.size + header_size)
+        columns = []
+        for name, dtype in zip(names, dtypes):
+            columns.append({'name': name, 'dtype': np.dtype(dtype).str, 'offset': offset})
+            offset = _align(offset + n_rows * np.dtype(dtype).itemsize)
+        header = json.dumps({'n_rows': n_rows, 'columns': columns}).encode('utf-8')
+        if len(header) <= header_size:
+            header = header.ljust(header_size)
+            return header, [c['offset'] for c in columns]
+        header_size = len(header)
+
+
+def _write_padding(f, offset):
+    position = f.tell()
+    if offset > position:
+        f.write(b'\0' * (offset - position))
+
+
+def write_columnar(file_path, names, columns):
+    n_rows = len(columns[0]) if columns else 0
+    dtypes = [np.asarray(c).dtype.newbyteorder('<') for c in columns]
+    header, offsets = _layout(names, dtypes, n_rows)
+    with open(file_path, 'wb') as f:
+        f.write(_prefix.pack(MAGIC, VERSION, len(header)))
+        f.write(header)
+        for column, dtype, offset in zip(columns, dtypes, offsets):
+            _write_padding(f, offset)
+            np.ascontiguousarray(column, dtype=dtype).tofile(f)
+
+
+def open_columnar(file_path):
+    '''
+    Returns the names and the read only memory mapped columns of the file.
+    '''
+    with open(file_path, 'rb') as f:
+        magic, version, header_length = _prefix.unpack(f.read(_prefix.size))
+        if magic != MAGIC:
+            raise ValueError('{} is not a columnar file'.format(file_path))
+        if version > VERSION:
+            raise ValueError('Unsupported columnar format version {0:d}'.format(version))
+        header = json.loads(f.read(header_length).decode('utf-8'))
+
+    n_rows = header['n_rows']
+    names = []
+    columns = []
+    for column in header['columns']:
+        names.append(column['name'])
+        if n_rows:
+            columns.append(np.memmap(file_path, dtype=np.dtype(column['dtype']), mode='r',
+                                     offset=column['offset'], shape=(n_rows,)))
+        else:
+            columns.append(np.zeros(0, dtype=np.dtype(column['dtype'])))
+    return names, columns
+
+
+def load_columnar(file_path):
+    '''
+    Opens the columnar file as a csv_loader.ParsedColumns object.
+    '''
+    names, columns = open_columnar(file_path)
+    n_rows = len(columns[0]) if columns else 0
+    parsed = csv_loader.ParsedColumns(columns, np.zeros(0, dtype=np.int64), n_rows, n_rows)
+    parsed.names = names
+    parsed.n_bytes = os.path.getsize(file_path)
+    return parsed
+
+
+def convert_csv_to_columnar(csv_path, out_path, n_columns=None, names=None, n_workers=1,
+                            chunk_size=64 * 2 ** 20, delimiter=None):
+    '''
+    Converts the csv file into a columnar file. Parsed ranges are appended
+    to one temporary file per column which are then joined, so the memory
+    used does not depend on the size of the file. The number of columns,
+    the delimiter and the names are sniffed from the file when not given.
+    Returns the line numbers of the rows which could not be parsed.
+    '''
+    csv_format = csv_loader.sniff_csv(csv_path)
+    if n_columns is None:
+        n_columns = csv_format.n_columns
+    if delimiter is None:
+        delimiter = csv_format.delimiter
+    if names is None and len(csv_format.names) == n_columns:
+        names = csv_format.names
+    if names is None:
+        names = ['x'] + ['y{0:d}'.format(i) for i in range(1, n_columns)]
+    tmp_paths = ['{0}.{1:d}.tmp'.format(out_path, i) for i in range(n_columns)]
+    tmp_files = [open(p, 'wb') for p in tmp_paths]
+    n_rows = 0
+    n_lines = 0
+    bad_rows = []
+    try:
+        for part, _, _ in csv_loader.iter_parse_csv(csv_path, n_columns, delimiter, n_workers, chunk_size):
+            for column, tmp_file in zip(part.columns, tmp_files):
+                column.astype('<f8').tofile(tmp_file)
+            bad_rows.append(part.bad_rows + n_lines)
+            n_lines += part.n_lines
+            n_rows += part.n_rows
+        for tmp_file in tmp_files:
+            tmp_file.close()
+
+        header, offsets = _layout(names, ['<f8'] * n_columns, n_rows)
+        with open(out_path, 'wb') as f:
+            f.write(_prefix.pack(MAGIC, VERSION, len(header)))
+            f.write(header)
+            for tmp_path, offset in zip(tmp_paths, offsets):
+                _write_padding(f, offset)
+                with open(tmp_path, 'rb') as tmp_file:
+                    shutil.copyfileobj(tmp_file, f, 2 ** 22)
+    finally:
+        for tmp_file, tmp_path in zip(tmp_files, tmp_paths):
+            tmp_file.close()
+            if os.path.isfile(tmp_path):
+                os.remove(tmp_path)
+    bad_rows = np.concatenate(bad_rows) if bad_rows else np.zeros(0, dtype=np.int64)
+    return bad_rows[bad_rows >= csv_format.n_header_lines]
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        sys.stderr.write(__doc__)
+        sys.exit(1)
+    _n_columns = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    _bad_rows = convert_csv_to_columnar(sys.argv[1], sys.argv[2], _n_columns)
+    if len(_bad_rows):
+        sys.stderr.write('{0:d} rows ignored\n'.format(len(_bad_rows)))
@@ -0,0 +1,144 @@
+'''
+Module with the streaming decompression of compressed input files. The
+compression is detected from the magic bytes of the file (from the
+extension for brotli which has none) and the file is decompressed by
+blocks, without writing the decompressed data to disk nor holding it in
+memory entirely.
+'''
+
+
+import os
+import zlib
+import bz2
+
+try:
+    import lzma
+except ImportError:
+    lzma = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import snappy
+except ImportError:
+    snappy = None
+
+
+magic_bytes = [(b'\x1f\x8b', 'gzip'),
+               (b'BZh', 'bz2'),
+               (b'\xfd7zXZ\x00', 'xz'),
+               (b'\xff\x06\x00\x00sNaPpY', 'snappy')]
+
+extensions = {'.br': 'brotli'}
+
+
+def detect_compression(file_path):
+    '''
+    Returns the name of the compression of the file, None for plain files.
+    '''
+    with open(file_path, 'rb') as f:
+        head = f.read(16)
+    for magic, name in magic_bytes:
+        if head.startswith(magic):
+            return name
+    return extensions.get(os.path.splitext(file_path)[1].lower())
+
+
+## Adapter of the brotli decompressor to the zlib decompressor interface
+class _BrotliDecompressor(object):
+
+    unused_data = b''
+
+    def __init__(self):
+        self._decompressor = brotli.Decompressor()
+
+    def decompress(self, data):
+        return self._decompressor.process(data)
+
+
+## Adapter of the snappy framing format decompressor to the zlib
+# decompressor interface
+class _SnappyDecompressor(object):
+
+    unused_data = b''
+
+    def __init__(self):
+        self._decompressor = snappy.StreamDecompressor()
+
+    def decompress(self, data):
+        return self._decompressor.decompress(data)
+
+
+def _new_decompressor(compression):
+    if compression == 'gzip':
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if compression == 'bz2':
+        return bz2.BZ2Decompressor()
+    if compression == 'xz':
+        if lzma is None:
+            raise ImportError('lzma module is needed to read xz files')
+        return lzma.LZMADecompressor()
+    if compression == 'brotli':
+        if brotli is None:
+            raise ImportError('brotli module is needed to read brotli files')
+        return _BrotliDecompressor()
+    if compression == 'snappy':
+        if snappy is None:
+            raise ImportError('snappy module is needed to read snappy files')
+        return _SnappyDecompressor()
+    raise ValueError('Unknown compression {}'.format(compression))
+
+
+def iter_decompressed(file_path, compression, read_size=2 ** 20):
+    '''
+    Yields (decompressed bytes, compressed bytes read so far). Files made of
+    several concatenated streams (gzip members, bz2 and xz streams) are
+    read entirely.
+    '''
+    decompressor = _new_decompressor(compression)
+    offset = 0
+    with open(file_path, 'rb') as f:
+        while True:
+            data = f.read(read_size)
+            if not data:
+                break
+            offset += len(data)
+            while data:
+                if getattr(decompressor, 'eof', False):
+                    # the previous stream ended exactly at the end of the
+                    # previous read, this one starts the next stream
+                    decompressor = _new_decompressor(compression)
+                block = decompressor.decompress(data)
+                if block:
+                    yield block, offset
+                data = decompressor.unused_data
+                if data:
+                    decompressor = _new_decompressor(compression)
+
+
+def iter_line_blocks(file_path, compression, block_size=64 * 2 ** 20):
+    '''
+    Yields (block, compressed bytes read so far) where blocks of about
+    block_size decompressed bytes end at a line end, except the last one.
+    '''
+    pending = []
+    pending_size = 0
+    offset = 0
+    for data, offset in iter_decompressed(file_path, compression):
+        pending.append(data)
+        pending_size += len(data)
+        if pending_size < block_size:
+            continue
+        buffered = b''.join(pending)
+        last_newline = buffered.rfind(b'\n')
+        if last_newline < 0:
+            pending = [buffered]
+            continue
+        yield buffered[:last_newline + 1], offset
+        pending = [buffered[last_newline + 1:]]
+        pending_size = len(pending[0])
+    if pending_size:
+        yield b''.join(pending), offset
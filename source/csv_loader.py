@@ -0,0 +1,536 @@
+'''
+Module with numpy based loaders of delimited text files. The whole file
+is parsed as one byte buffer: fields are located and validated with array
+operations and converted to float64 in a single call per column, so that
+the python interpreter never iterates over lines.
+'''
+
+
+import os
+import time
+import warnings
+import itertools
+import collections
+import multiprocessing
+
+import numpy as np
+
+import compression
+
+from profiling import tracer
+
+
+_SPACE_BYTES = b' \t\r'
+_NUMERIC_BYTES = b'0123456789+-.eEnNaAiIfF'
+
+
+## Result of the parsing of a delimited text buffer
+class ParsedColumns(object):
+
+    def __init__(self, columns, bad_rows, n_rows, n_lines=0):
+        super(ParsedColumns, self).__init__()
+        # list of contiguous float64 arrays, one per column
+        self.columns = columns
+        # 0-based line numbers of the rows that could not be parsed
+        self.bad_rows = bad_rows
+        # number of valid rows
+        self.n_rows = n_rows
+        # number of lines in the parsed buffer, blank ones included
+        self.n_lines = n_lines
+        # pyramid.MinMaxPyramid of each column, when built
+        self.pyramids = []
+        # size of the part of the file that was parsed
+        self.n_bytes = 0
+        # names of the columns, when known from the file
+        self.names = []
+
+
+def _byte_mask(buf, chars):
+    lut = np.zeros(256, dtype=bool)
+    lut[np.frombuffer(chars, dtype=np.uint8)] = True
+    return lut[buf]
+
+
+def _parse_stream(stream, tok_starts, tok_ends, first, last, values, invalid):
+    '''
+    Parses the tokens first..last-1 of the space separated stream into values.
+    A failing range is bisected so that only the malformed tokens are
+    converted one by one.
+    '''
+    if first >= last:
+        return
+    chunk = stream[tok_starts[first]:tok_ends[last - 1] + 1]
+    try:
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            parsed = np.fromstring(chunk, dtype=np.float64, sep=' ')
+        if len(parsed) == last - first and not caught:
+            values[first:last] = parsed
+            return
+    except ValueError:
+        pass
+    if last - first == 1:
+        try:
+            values[first] = float(chunk)
+        except ValueError:
+            values[first] = np.nan
+            invalid[first] = True
+        return
+    middle = (first + last) // 2
+    _parse_stream(stream, tok_starts, tok_ends, first, middle, values, invalid)
+    _parse_stream(stream, tok_starts, tok_ends, middle, last, values, invalid)
+
+
+def parse_buffer(raw, n_columns=2, delimiter=b','):
+    '''
+    Parses the first n_columns fields of each line of the bytes buffer raw.
+    Blank lines are skipped, lines with missing or non numeric fields are
+    reported in bad_rows of the returned ParsedColumns object.
+    '''
+    buf = np.frombuffer(raw, dtype=np.uint8)
+    n_bytes = len(buf)
+    delim = ord(delimiter)
+
+    newlines = np.flatnonzero(buf == 10)
+    starts = np.concatenate(([0], newlines + 1))
+    ends = np.concatenate((newlines, [n_bytes]))
+    if starts[-1] == n_bytes:
+        starts = starts[:-1]
+        ends = ends[:-1]
+
+    # tokens are the runs of bytes which are neither spaces, nor delimiters,
+    # nor newlines
+    solid = ~_byte_mask(buf, _SPACE_BYTES + b'\n' + delimiter)
+    tok_starts = solid.copy()
+    tok_starts[1:] &= ~solid[:-1]
+    tok_starts = np.flatnonzero(tok_starts)
+    tok_ends = solid.copy()
+    tok_ends[:-1] &= ~solid[1:]
+    tok_ends = np.flatnonzero(tok_ends)
+    n_tokens = len(tok_starts)
+
+    # tokens with non numeric characters (headers, text) are replaced by
+    # zeros in the stream and flagged as invalid
+    invalid = np.zeros(n_tokens, dtype=bool)
+    non_numeric = np.flatnonzero(solid & ~_byte_mask(buf, _NUMERIC_BYTES))
+    stream = np.where(solid, buf, np.uint8(32)).astype(np.uint8)
+    if len(non_numeric):
+        bad_tokens = np.unique(np.searchsorted(tok_starts, non_numeric, 'right') - 1)
+        invalid[bad_tokens] = True
+        lengths = tok_ends[bad_tokens] - tok_starts[bad_tokens] + 1
+        offsets = np.repeat(tok_starts[bad_tokens] - (np.cumsum(lengths) - lengths), lengths)
+        stream[offsets + np.arange(lengths.sum())] = ord('0')
+    values = np.empty(n_tokens, dtype=np.float64)
+    _parse_stream(stream.tobytes(), tok_starts, tok_ends, 0, n_tokens, values, invalid)
+
+    blank = np.searchsorted(tok_starts, starts) == np.searchsorted(tok_starts, ends)
+    bad = np.zeros(len(starts), dtype=bool)
+
+    delim_positions = np.concatenate((np.flatnonzero(buf == delim), [n_bytes]))
+
+    field_tokens = []
+    field_start = starts
+    for k in range(n_columns):
+        if k:
+            bad |= field_end >= ends
+            field_start = np.minimum(field_end + 1, ends)
+        next_delim = delim_positions[np.searchsorted(delim_positions, field_start)]
+        field_end = np.minimum(next_delim, ends)
+
+        # a valid field holds exactly one numeric token
+        first_token = np.searchsorted(tok_starts, field_start)
+        bad |= np.searchsorted(tok_starts, field_end) - first_token != 1
+        first_token = np.minimum(first_token, max(n_tokens - 1, 0))
+        if n_tokens:
+            bad |= invalid[first_token]
+        field_tokens.append(first_token)
+
+    good = ~blank & ~bad
+    columns = [values[tokens[good]] for tokens in field_tokens]
+    bad_rows = np.flatnonzero(bad & ~blank)
+    return ParsedColumns(columns, bad_rows, int(good.sum()), len(starts))
+
+
+## Format of a delimited text file, as guessed by sniff_csv
+class CsvFormat(object):
+
+    def __init__(self, delimiter=b',', n_columns=2, names=None, n_header_lines=0):
+        super(CsvFormat, self).__init__()
+        self.delimiter = delimiter
+        self.n_columns = n_columns
+        self.names = names or []
+        # number of leading lines which are not rows of numbers
+        self.n_header_lines = n_header_lines
+
+
+_SNIFFED_DELIMITERS = [b',', b'\t', b';', b'|', b' ']
+
+
+def _read_head(file_path, block_size):
+    compression_name = compression.detect_compression(file_path)
+    if compression_name is None:
+        with open(file_path, 'rb') as f:
+            return f.read(block_size)
+    blocks = []
+    size = 0
+    for data, _ in compression.iter_decompressed(file_path, compression_name):
+        blocks.append(data)
+        size += len(data)
+        if size >= block_size:
+            break
+    return b''.join(blocks)[:block_size]
+
+
+def _is_numeric_row(fields):
+    try:
+        for field in fields:
+            float(field)
+    except ValueError:
+        return False
+    return True
+
+
+def sniff_csv(file_path, block_size=2 ** 16, max_lines=200):
+    '''
+    Guesses the delimiter, the number of columns and the header of the file
+    from its first block only. The delimiter is the candidate which splits
+    most lines in the same number of fields.
+    '''
+    head = _read_head(file_path, block_size)
+    if len(head) == block_size and b'\n' in head:
+        head = head[:head.rfind(b'\n')]
+    lines = [line.strip() for line in head.split(b'\n')[:max_lines]]
+    lines = [line for line in lines if line]
+    if not lines:
+        return CsvFormat()
+
+    best = None
+    for delimiter in _SNIFFED_DELIMITERS:
+        counts = [line.count(delimiter) for line in lines]
+        n_delimiters = max(set(counts), key=counts.count)
+        score = counts.count(n_delimiters)
+        if n_delimiters and (best is None or score > best[0]):
+            best = (score, delimiter, n_delimiters + 1)
+    if best is None:
+        return CsvFormat(n_columns=1)
+    _, delimiter, n_columns = best
+    # when most lines end with a delimiter the last column is empty
+    if 2 * sum(line.endswith(delimiter) for line in lines) > len(lines):
+        n_columns -= 1
+    if n_columns < 2:
+        return CsvFormat(delimiter, max(n_columns, 1))
+
+    n_header_lines = 0
+    for line in lines:
+        fields = line.split(delimiter)[:n_columns]
+        if len(fields) == n_columns and _is_numeric_row(fields):
+            break
+        n_header_lines += 1
+    if n_header_lines == len(lines):
+        n_header_lines = 0
+
+    names = []
+    if n_header_lines:
+        fields = [f.strip().strip(b'"\'').decode('utf-8', 'replace')
+                  for f in lines[n_header_lines - 1].split(delimiter)]
+        if len(fields) >= n_columns and all(fields[:n_columns]):
+            names = fields[:n_columns]
+    # blank lines before the header are lines of the file too
+    n_header_lines = _count_leading_lines(head, n_header_lines)
+    return CsvFormat(delimiter, n_columns, names, n_header_lines)
+
+
+def _count_leading_lines(head, n_non_blank):
+    '''
+    Number of lines, blank ones included, before the n_non_blank-th non
+    blank line of head.
+    '''
+    if not n_non_blank:
+        return 0
+    seen = 0
+    for i, line in enumerate(head.split(b'\n')):
+        if line.strip():
+            seen += 1
+            if seen == n_non_blank:
+                return i + 1
+    return seen
+
+
+def drop_header_rows(parsed, n_header_lines):
+    '''
+    Removes the header lines from the bad rows reported by the parsing.
+    '''
+    if n_header_lines:
+        parsed.bad_rows = parsed.bad_rows[parsed.bad_rows >= n_header_lines]
+    return parsed
+
+
+# files of less than pool_min_chunks chunks are parsed in process, starting
+# the worker processes would cost more than their parsing
+pool_min_chunks = 2
+
+
+def complete_lines_end(file_path, block_size=2 ** 16):
+    '''
+    Returns the offset of the end of the last complete line of the file,
+    the offset following its last newline, 0 when it has none.
+    '''
+    end = os.path.getsize(file_path)
+    with open(file_path, 'rb') as f:
+        while end > 0:
+            start = max(end - block_size, 0)
+            f.seek(start)
+            last_newline = f.read(end - start).rfind(b'\n')
+            if last_newline >= 0:
+                return start + last_newline + 1
+            end = start
+    return 0
+
+
+def split_byte_ranges(file_path, n_chunks, file_size=None):
+    '''
+    Splits the first file_size bytes of the file, the whole file by default,
+    into n_chunks byte ranges (start, end) of about the same size. Each
+    boundary is moved to the beginning of the next line so that no line is
+    shared by two ranges.
+    '''
+    if file_size is None:
+        file_size = os.path.getsize(file_path)
+    n_chunks = max(1, min(n_chunks, file_size))
+    boundaries = [0]
+    with open(file_path, 'rb') as f:
+        for i in range(1, n_chunks):
+            f.seek(i * file_size // n_chunks)
+            f.readline()
+            boundary = f.tell()
+            if boundary > boundaries[-1] and boundary < file_size:
+                boundaries.append(boundary)
+    boundaries.append(file_size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def _init_worker():
+    # spans of the workers are timed by hand and recorded by the parent,
+    # the sinks of the inherited tracer belong to the parent process
+    tracer.detach()
+
+
+def _parse_range(args):
+    '''
+    Reads and parses a byte range of a file. Returns the ParsedColumns, the
+    (name, start, duration, args) timings of the steps and the process id,
+    so that the timings of workers are recorded by the parent process.
+    '''
+    file_path, start, end, n_columns, delimiter = args
+    read_start = time.time()
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        raw = f.read(end - start)
+    parse_start = time.time()
+    parsed = parse_buffer(raw, n_columns, delimiter)
+    parse_end = time.time()
+    timings = [('read_range', read_start, parse_start - read_start, {'start': start, 'end': end}),
+               ('parse_buffer', parse_start, parse_end - parse_start, {'n_bytes': len(raw)})]
+    return parsed, timings, os.getpid()
+
+
+def _parse_block(args):
+    raw, n_columns, delimiter = args
+    parse_start = time.time()
+    parsed = parse_buffer(raw, n_columns, delimiter)
+    timings = [('parse_buffer', parse_start, time.time() - parse_start, {'n_bytes': len(raw)})]
+    return parsed, timings, os.getpid()
+
+
+def _record_timings(result):
+    '''
+    Records the timings returned by _parse_range or _parse_block, returns
+    the ParsedColumns.
+    '''
+    parsed, timings, pid = result
+    if tracer.enabled:
+        thread = None if pid == os.getpid() else 'worker {0:d}'.format(pid)
+        for name, start, duration, args in timings:
+            tracer.record_span(name, start, duration, thread, args)
+    return parsed
+
+
+def _start_pool(n_workers):
+    return multiprocessing.Pool(n_workers, initializer=_init_worker)
+
+
+def _stop_pool(pool, completed, name, start, **args):
+    if completed:
+        pool.close()
+    else:
+        pool.terminate()
+    pool.join()
+    args['completed'] = completed
+    tracer.record_span(name, start, time.time() - start, args=args)
+
+
+def _iter_pool_results(pool, function, tasks, window):
+    '''
+    Like pool.imap but with at most window pending tasks, so that the tasks
+    generator is not consumed ahead of the workers.
+    '''
+    pending = collections.deque()
+    for task in tasks:
+        pending.append(pool.apply_async(function, (task,)))
+        if len(pending) >= window:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
+def iter_parse_compressed(file_path, compression_name, n_columns=2, delimiter=b',', n_workers=1,
+                          chunk_size=64 * 2 ** 20):
+    '''
+    Parses the compressed delimited text file by newline aligned blocks of
+    about chunk_size decompressed bytes, decompressed in a stream. Yields
+    (parsed block, compressed bytes read, compressed file size) in the file
+    order.
+    '''
+    file_size = os.path.getsize(file_path)
+    blocks = compression.iter_line_blocks(file_path, compression_name, chunk_size)
+    # the decompressed size is unknown, the first blocks tell whether the
+    # file is large enough for the pool
+    head = list(itertools.islice(blocks, pool_min_chunks))
+    blocks = itertools.chain(head, blocks)
+    if n_workers <= 1 or len(head) < pool_min_chunks:
+        for raw, offset in blocks:
+            yield _record_timings(_parse_block((raw, n_columns, delimiter))), offset, file_size
+        return
+
+    offsets = collections.deque()
+
+    def tasks():
+        for raw, offset in blocks:
+            offsets.append(offset)
+            yield raw, n_columns, delimiter
+
+    pool_start = time.time()
+    pool = _start_pool(n_workers)
+    completed = False
+    try:
+        for result in _iter_pool_results(pool, _parse_block, tasks(), 2 * n_workers):
+            yield _record_timings(result), offsets.popleft(), file_size
+        completed = True
+    finally:
+        _stop_pool(pool, completed, 'parse_pool', pool_start, n_workers=n_workers)
+
+
+def concatenate_parsed(parts):
+    '''
+    Joins the results of the parsing of consecutive parts of a file, line
+    numbers of bad rows are shifted by the number of lines of previous parts.
+    '''
+    n_columns = len(parts[0].columns)
+    columns = [np.concatenate([p.columns[k] for p in parts]) for k in range(n_columns)]
+    bad_rows = []
+    line_offset = 0
+    for part in parts:
+        bad_rows.append(part.bad_rows + line_offset)
+        line_offset += part.n_lines
+    bad_rows = np.concatenate(bad_rows)
+    n_rows = sum(p.n_rows for p in parts)
+    return ParsedColumns(columns, bad_rows, n_rows, line_offset)
+
+
+def iter_parse_csv(file_path, n_columns=2, delimiter=b',', n_workers=1, chunk_size=64 * 2 ** 20,
+                   complete_lines=False):
+    '''
+    Parses the delimited text file by newline aligned byte ranges of about
+    chunk_size bytes, in a pool of at most n_workers processes when
+    n_workers > 1 and the file has at least pool_min_chunks ranges.
+    Yields (parsed range, end offset of the range, file size) in the file
+    order. Closing the generator terminates the pending parsing. Compressed
+    files are decompressed in a stream, the offsets are then offsets in the
+    compressed file.
+
+    With complete_lines, an unterminated last line of a plain file, which
+    may still be being written, is not parsed: the last range ends at the
+    last newline.
+    '''
+    compression_name = compression.detect_compression(file_path)
+    if compression_name is not None:
+        for result in iter_parse_compressed(file_path, compression_name, n_columns, delimiter,
+                                            n_workers, chunk_size):
+            yield result
+        return
+
+    file_size = os.path.getsize(file_path)
+    parsed_size = complete_lines_end(file_path) if complete_lines else file_size
+    n_chunks = max(1, -(-parsed_size // chunk_size))
+    ranges = split_byte_ranges(file_path, n_chunks, parsed_size)
+    tasks = [(file_path, start, end, n_columns, delimiter) for start, end in ranges]
+
+    if n_workers > 1 and len(tasks) >= pool_min_chunks:
+        n_processes = min(n_workers, len(tasks))
+        pool_start = time.time()
+        pool = _start_pool(n_processes)
+        completed = False
+        try:
+            for task, result in zip(tasks, pool.imap(_parse_range, tasks)):
+                yield _record_timings(result), task[2], file_size
+            completed = True
+        finally:
+            _stop_pool(pool, completed, 'parse_pool', pool_start,
+                       n_workers=n_processes, n_ranges=len(tasks))
+    else:
+        for task in tasks:
+            yield _record_timings(_parse_range(task)), task[2], file_size
+
+
+def load_csv(file_path, n_columns=2, delimiter=b',', n_workers=1, chunk_size=64 * 2 ** 20):
+    parts = [part for part, _, _ in iter_parse_csv(file_path, n_columns, delimiter, n_workers, chunk_size)]
+    if len(parts) == 1:
+        return parts[0]
+    return concatenate_parsed(parts)
+
+
+def load_sniffed_csv(file_path, n_workers=1, chunk_size=64 * 2 ** 20):
+    '''
+    Sniffs the format of the file and parses all its columns. Returns the
+    CsvFormat and the ParsedColumns of the file.
+    '''
+    csv_format = sniff_csv(file_path)
+    parsed = load_csv(file_path, csv_format.n_columns, csv_format.delimiter, n_workers, chunk_size)
+    parsed.names = csv_format.names
+    parsed.n_bytes = os.path.getsize(file_path)
+    return csv_format, drop_header_rows(parsed, csv_format.n_header_lines)
+
+
+def _load_sniffed_csv_task(args):
+    # errors are returned since an exception would stop the whole pool.imap
+    index, file_path = args
+    try:
+        return index, load_sniffed_csv(file_path), None
+    except Exception as e:
+        return index, None, str(e)
+
+
+def iter_load_files(file_paths, n_workers=1):
+    '''
+    Sniffs and parses the files in a pool of n_workers processes, one file
+    per process. Yields (index of the file, (CsvFormat, ParsedColumns) or
+    None, error message or None) as the files are parsed. Closing the
+    generator terminates the pending parsing.
+    '''
+    tasks = list(enumerate(file_paths))
+    if n_workers <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            yield _load_sniffed_csv_task(task)
+        return
+
+    n_processes = min(n_workers, len(tasks))
+    pool_start = time.time()
+    pool = _start_pool(n_processes)
+    completed = False
+    try:
+        for result in pool.imap_unordered(_load_sniffed_csv_task, tasks):
+            yield result
+        completed = True
+    finally:
+        _stop_pool(pool, completed, 'load_files_pool', pool_start,
+                   n_workers=n_processes, n_files=len(tasks))
@@ -0,0 +1,207 @@
+'''
+Module with the lookup of the points of xy series nearest to a cursor. On
+a series with sorted X the point is found by binary search. The points of
+a series with unsorted X are indexed once, in a background thread, by a
+packed two level tree of bounding boxes: the points are sorted by X into
+vertical slabs, by Y inside each slab, and cut into leaves of leaf_size
+points, themselves grouped by group_size leaves. A lookup only reads the
+boxes of the groups, then of the leaves and the points of the leaves which
+can hold a point nearer than the nearest one found so far, so it is exact
+and does not depend on where the cursor is relative to the data.
+'''
+
+
+import time
+import threading
+
+import numpy as np
+
+
+# number of points of the leaves of the spatial index
+leaf_size = 128
+
+# number of leaves of the groups of the spatial index
+group_size = 64
+
+
+def nearest_sorted(x, x_value):
+    '''
+    Index of the value of the sorted array x nearest to x_value. x can be
+    any array like with searchsorted, e.g. a storage.UniformColumn.
+    '''
+    n_values = len(x)
+    if not n_values:
+        return None
+    i = int(x.searchsorted(x_value, 'left'))
+    if i == 0:
+        return 0
+    if i >= n_values:
+        return n_values - 1
+    return i - 1 if x_value - x[i - 1] <= x[i] - x_value else i
+
+
+def _box_distances(x_min, x_max, y_min, y_max, x_value, y_value, scales):
+    # squared scaled distances from the point to the boxes, 0 inside them
+    dx = np.maximum(np.maximum(x_min - x_value, x_value - x_max), 0.0) / scales[0]
+    dy = np.maximum(np.maximum(y_min - y_value, y_value - y_max), 0.0) / scales[1]
+    return dx * dx + dy * dy
+
+
+## Spatial index of the points of a series, exact nearest point lookup with
+# distances scaled differently along X and Y
+class SpatialIndex(object):
+
+    def __init__(self, x, y, leaf_size=leaf_size, group_size=group_size):
+        super(SpatialIndex, self).__init__()
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        # points with a NaN coordinate are never the nearest
+        kept = np.flatnonzero(~(np.isnan(x) | np.isnan(y)))
+        order = kept[np.argsort(x[kept], kind='mergesort')]
+        n_values = len(order)
+        self.n_values = n_values
+        if not n_values:
+            return
+
+        # vertical slabs of whole leaves, sorted by Y
+        n_leaves = -(-n_values // leaf_size)
+        n_slabs = max(1, int(np.sqrt(n_leaves)))
+        slab_size = leaf_size * -(-n_leaves // n_slabs)
+        for start in range(0, n_values, slab_size):
+            slab = order[start:start + slab_size]
+            order[start:start + slab_size] = slab[np.argsort(y[slab], kind='mergesort')]
+        # the last leaf is completed with copies of the last point
+        order = np.concatenate((order, np.repeat(order[-1:], n_leaves * leaf_size - n_values)))
+
+        index_type = np.int32 if len(x) < 2 ** 31 else np.int64
+        self.order = order.astype(index_type)
+        self.x = x[order]
+        self.y = y[order]
+        self.leaf_size = leaf_size
+        self.group_size = group_size
+
+        leaf_x = self.x.reshape(n_leaves, leaf_size)
+        leaf_y = self.y.reshape(n_leaves, leaf_size)
+        self.leaves = (leaf_x.min(axis=1), leaf_x.max(axis=1), leaf_y.min(axis=1), leaf_y.max(axis=1))
+        group_starts = np.arange(0, n_leaves, group_size)
+        self.groups = tuple(function.reduceat(values, group_starts) for function, values in
+                            zip((np.minimum, np.maximum, np.minimum, np.maximum), self.leaves))
+
+    def _nearest_in_leaves(self, leaves, x_value, y_value, scales):
+        points = (leaves[:, None] * self.leaf_size + np.arange(self.leaf_size)).ravel()
+        dx = (self.x[points] - x_value) / scales[0]
+        dy = (self.y[points] - y_value) / scales[1]
+        distances = dx * dx + dy * dy
+        k = int(np.argmin(distances))
+        return distances[k], points[k]
+
+    def nearest(self, x_value, y_value=None, scales=(1.0, 1.0)):
+        '''
+        Position in the index of the point nearest to (x_value, y_value),
+        distances along X and Y being divided by scales. Only X is compared
+        when y_value is None. Returns None when the index is empty.
+        '''
+        if not self.n_values:
+            return None
+        if y_value is None:
+            y_value, scales = 0.0, (scales[0], np.inf)
+        n_leaves = len(self.leaves[0])
+        group_distances = _box_distances(*(self.groups + (x_value, y_value, scales)))
+
+        # the nearest box of the nearest group gives a first bound
+        group = int(np.argmin(group_distances))
+        leaves = np.arange(group * self.group_size, min((group + 1) * self.group_size, n_leaves))
+        leaf_distances = _box_distances(*([box[leaves] for box in self.leaves] +
+                                          [x_value, y_value, scales]))
+        leaf = leaves[int(np.argmin(leaf_distances))]
+        best, best_point = self._nearest_in_leaves(leaves[leaves == leaf], x_value, y_value, scales)
+
+        # the other points nearer than the bound are in the leaves nearer
+        # than the bound, in the groups nearer than the bound
+        groups = np.flatnonzero(group_distances < best)
+        leaves = (groups[:, None] * self.group_size + np.arange(self.group_size)).ravel()
+        leaves = leaves[leaves < n_leaves]
+        leaf_distances = _box_distances(*([box[leaves] for box in self.leaves] +
+                                          [x_value, y_value, scales]))
+        leaves = leaves[(leaf_distances < best) & (leaves != leaf)]
+        if len(leaves):
+            distance, point = self._nearest_in_leaves(leaves, x_value, y_value, scales)
+            if distance < best:
+                best_point = point
+        return best_point
+
+    def point(self, position):
+        return int(self.order[position]), float(self.x[position]), float(self.y[position])
+
+
+## Lookup of the nearest point of one series. The index of a series with
+# unsorted X is built at creation and when the values of the series change,
+# in a background thread when background is True. Changes during a build
+# are coalesced into one build, started after a pause as long as the build;
+# lookups use the previous index meanwhile
+class SeriesCursor(object):
+
+    def __init__(self, series, background=False):
+        super(SeriesCursor, self).__init__()
+        self.series = series
+        self.background = background
+        self._index = None
+        self._lock = threading.Lock()
+        self._building = False
+        self._stale = False
+        self.update()
+
+    def set_series(self, series):
+        self.series = series
+        self.update()
+
+    def update(self):
+        series = self.series
+        if series.x_sorted:
+            self._index = None
+            return
+        if not self.background:
+            self._index = SpatialIndex(series.x, series.y)
+            return
+        with self._lock:
+            if self._building:
+                self._stale = True
+                return
+            self._building = True
+        thread = threading.Thread(target=self._build_index)
+        thread.daemon = True
+        thread.start()
+
+    def _build_index(self):
+        while True:
+            start = time.time()
+            series = self.series
+            # numpy releases the gil while sorting
+            index = SpatialIndex(series.x, series.y)
+            with self._lock:
+                if series is self.series and not series.x_sorted:
+                    self._index = index
+                if not self._stale:
+                    self._building = False
+                    return
+                self._stale = False
+            time.sleep(time.time() - start)
+
+    def nearest(self, x_value, y_value=None, scales=(1.0, 1.0)):
+        '''
+        Returns the (x, y) values of the nearest point, None when there is
+        none or when the index of the series is not built yet.
+        '''
+        series = self.series
+        if series.x_sorted:
+            i = nearest_sorted(series.x, x_value)
+            if i is None:
+                return None
+            return float(series.x[i]), float(series.y[i])
+        index = self._index
+        if index is None:
+            return None
+        position = index.nearest(x_value, y_value, scales)
+        if position is None:
+            return None
+        return index.point(position)[1:]
@@ -0,0 +1,97 @@
+'''
+Module with the zero-copy bridge between numpy arrays and the columns of
+vtk tables.
+
+A vtk array created from a numpy array without copy only holds a raw
+pointer on the numpy buffer. numpy_support keeps the numpy array alive as
+an attribute of the python wrapper of the vtk array, which is not enough:
+the wrapper can be collected while the vtk array is still referenced by a
+vtkTable or a plot, and the buffer is then freed under vtk. The bridge
+keeps each shared buffer in a registry until vtk deletes the array.
+'''
+
+
+import numpy as np
+
+from vtk.util import numpy_support
+
+
+# numpy buffers shared with vtk arrays, by address of the vtk array
+_shared_buffers = {}
+
+
+def _release(address):
+    def on_delete(obj, event):
+        _shared_buffers.pop(address, None)
+    return on_delete
+
+
+def _keep_alive(vtk_array, values):
+    address = vtk_array.__this__
+    if address not in _shared_buffers:
+        # the callback must not reference the vtk array itself, it would
+        # never be deleted
+        vtk_array.AddObserver('DeleteEvent', _release(address))
+    _shared_buffers[address] = values
+
+
+def shared_buffers_count():
+    return len(_shared_buffers)
+
+
+def as_vtk_column(values, name=None):
+    '''
+    Returns a vtk array sharing the memory of the 1-D numpy array values.
+    Arrays which are not contiguous or not in the native byte order are
+    copied first. vtk arrays are returned as is.
+    '''
+    if not isinstance(values, np.ndarray):
+        if name is not None and values.GetName() is None:
+            values.SetName(name)
+        return values
+    if values.ndim != 1:
+        raise ValueError('Columns must be 1-D arrays, not {0:d}-D'.format(values.ndim))
+    if not values.flags.c_contiguous or not values.dtype.isnative:
+        values = np.ascontiguousarray(values, dtype=values.dtype.newbyteorder('='))
+    vtk_array = numpy_support.numpy_to_vtk(values, deep=False)
+    _keep_alive(vtk_array, values)
+    if name is not None:
+        vtk_array.SetName(name)
+    return vtk_array
+
+
+def repoint(vtk_array, values):
+    '''
+    Makes the vtk array use the memory of the contiguous numpy array values
+    (e.g. after the buffer of a column was reallocated), the previous
+    buffer is released.
+    '''
+    vtk_array.SetVoidArray(values, len(values), 1)
+    _keep_alive(vtk_array, values)
+    vtk_array.Modified()
+
+
+def to_numpy(vtk_array):
+    '''
+    Returns a numpy view, without copy, of the vtk array. The view of an
+    array sharing a numpy buffer holds a reference on the buffer, which
+    stays valid when the vtk array is repointed or deleted; the view of
+    other arrays holds a reference on the vtk array.
+    '''
+    values = _shared_buffers.get(vtk_array.__this__)
+    if values is not None and len(values) == vtk_array.GetNumberOfTuples():
+        return values.view()
+    return numpy_support.vtk_to_numpy(vtk_array)
+
+
+def table_columns(table):
+    '''
+    Returns the names and the numpy views of the columns of the vtkTable.
+    '''
+    names = []
+    columns = []
+    for i in range(table.GetNumberOfColumns()):
+        column = table.GetColumn(i)
+        names.append(column.GetName())
+        columns.append(to_numpy(column))
+    return names, columns
@@ -0,0 +1,184 @@
+'''
+Module with the level of detail decimation of xy series. Only the points
+of the visible X range are kept, reduced to the minimum and the maximum of
+each horizontal bucket so that the drawn envelope of the curve is the same
+as the one of the full resolution data. NaN values are ignored by the
+extrema, like by the pyramids.
+'''
+
+
+import itertools
+
+import numpy as np
+
+from pyramid import MinMaxPyramid, block_extrema, is_sorted
+from storage import UniformColumn
+
+
+# versions of the values of the series, they change whenever the values do
+_versions = itertools.count()
+
+
+def _same_values(values, other):
+    '''
+    True when the two columns are the same buffer or the same implicit
+    column, e.g. when a table is rebuilt from the columns it holds.
+    '''
+    if isinstance(values, UniformColumn) or isinstance(other, UniformColumn):
+        return isinstance(values, UniformColumn) and isinstance(other, UniformColumn) and \
+            (values.start, values.step, values.n_values) == (other.start, other.step, other.n_values)
+    values, other = np.asarray(values), np.asarray(other)
+    return values.dtype == other.dtype and values.shape == other.shape and \
+        values.__array_interface__['data'][0] == other.__array_interface__['data'][0]
+
+
+def minmax_indices(y, first, last, n_buckets):
+    '''
+    Returns the sorted indices of the minimum and of the maximum of y in
+    each of n_buckets buckets of equal size covering the range first..last-1.
+    '''
+    n_values = last - first
+    if n_values <= 2 * n_buckets:
+        return np.arange(first, last)
+
+    size = n_values // n_buckets
+    body_end = first + size * n_buckets
+    buckets = y[first:body_end].reshape(n_buckets, size)
+    offsets = first + np.arange(n_buckets) * size
+    bucket_min, bucket_max = block_extrema(buckets)
+    i_min = offsets + bucket_min
+    i_max = offsets + bucket_max
+
+    indices = np.empty(2 * n_buckets, dtype=np.int64)
+    indices[0::2] = np.minimum(i_min, i_max)
+    indices[1::2] = np.maximum(i_min, i_max)
+    if body_end < last:
+        tail_min, tail_max = block_extrema(y[body_end:last].reshape(1, -1))
+        tail_indices = body_end + np.unique([tail_min[0], tail_max[0]])
+        indices = np.concatenate((indices, tail_indices))
+    return indices
+
+
+## Full resolution xy series and its decimation for a visible X range
+class DecimatedSeries(object):
+
+    def __init__(self, x, y, x_sorted=None, pyramid=None):
+        super(DecimatedSeries, self).__init__()
+        self.x = x
+        self.y = y
+        self.x_sorted = is_sorted(x) if x_sorted is None else x_sorted
+        # optional pyramid.MinMaxPyramid of y
+        self.pyramid = pyramid
+        self._extent_indices = None
+        self.version = next(_versions)
+
+    def __len__(self):
+        return len(self.y)
+
+    def set_values(self, x, y, x_sorted):
+        '''
+        Replaces the full resolution arrays, e.g. after rows were appended.
+        The pyramid, built for the previous values, is dropped.
+        '''
+        self.x = x
+        self.y = y
+        self.x_sorted = x_sorted
+        self.pyramid = None
+        self._extent_indices = None
+        self.version = next(_versions)
+
+    def keep_version(self, previous):
+        '''
+        Takes the version of the series previous when both have the same
+        values, so that what was computed from previous still holds.
+        '''
+        if _same_values(self.x, previous.x) and _same_values(self.y, previous.y):
+            self.version = previous.version
+
+    @property
+    def extent_indices(self):
+        '''
+        First, last and extremal points, always kept so that the bounds of
+        the decimated series are the ones of the full series.
+        '''
+        if self._extent_indices is None:
+            n_values = len(self)
+            if self.pyramid is not None:
+                i_min, i_max = self.pyramid.extrema
+            else:
+                i_min, i_max = block_extrema(np.asarray(self.y).reshape(1, -1))
+                i_min, i_max = i_min[0], i_max[0]
+            self._extent_indices = np.unique([0, n_values - 1, i_min, i_max])
+        return self._extent_indices
+
+    @property
+    def range_index(self):
+        '''
+        Min/max pyramid of y, built on the first range query when it was
+        not loaded with the data.
+        '''
+        if self.pyramid is None and len(self):
+            self.pyramid = MinMaxPyramid.build(self.y)
+        return self.pyramid
+
+    def y_range(self, x_min, x_max):
+        '''
+        Minimum and maximum of y over the points between x_min and x_max in
+        O(log n), NaN values ignored, None when there is no such point or
+        only NaN values. Series with unsorted X can not be cut by X, the
+        range of the whole series is returned.
+        '''
+        if not len(self):
+            return None
+        if self.x_sorted:
+            first = int(self.x.searchsorted(x_min, 'left'))
+            last = int(self.x.searchsorted(x_max, 'right'))
+            if first >= last:
+                return None
+        else:
+            first, last = 0, len(self)
+        i_min, i_max = self.range_index.range_extrema(first, last)
+        y_min, y_max = float(self.y[i_min]), float(self.y[i_max])
+        if np.isnan(y_min):
+            return None
+        return y_min, y_max
+
+    @property
+    def x_bounds(self):
+        if not len(self):
+            return None
+        if self.x_sorted:
+            return float(self.x[0]), float(self.x[-1])
+        return float(np.nanmin(self.x)), float(np.nanmax(self.x))
+
+    def visible_range(self, x_min, x_max):
+        '''
+        Indices first, last of the points between x_min and x_max, with one
+        more point on each side so that the curve crosses the plot borders.
+        '''
+        if not self.x_sorted:
+            return 0, len(self)
+        first = max(int(self.x.searchsorted(x_min, 'left')) - 1, 0)
+        last = min(int(self.x.searchsorted(x_max, 'right')) + 1, len(self))
+        return first, last
+
+    def decimate(self, x_min, x_max, n_buckets):
+        '''
+        Returns the x, y arrays to draw for the range x_min..x_max with
+        about 2 * n_buckets points. Small series are returned as is. An
+        implicit X (storage.UniformColumn) is only computed at the returned
+        indices.
+        '''
+        n_values = len(self)
+        if n_values <= 2 * n_buckets:
+            return np.asarray(self.x), self.y
+
+        first, last = self.visible_range(x_min, x_max)
+        indices = None
+        if self.pyramid is not None:
+            indices = self.pyramid.window_indices(first, last, n_buckets)
+        if indices is None:
+            indices = minmax_indices(self.y, first, last, n_buckets)
+        if self.x_sorted:
+            indices = np.union1d(indices, self.extent_indices)
+        return self.x[indices], self.y[indices]
@@ -0,0 +1,144 @@
+'''
+Module with the density rendering of scatter series too large to be drawn
+as markers. The points of the visible window are counted in a 2D histogram
+with one bin per pixel of the plot area. The binning is vectorized and runs
+by chunks of points, so that it can be spread over several iterations of
+the event loop and shown while it progresses. While the number of points
+in the window stays small their indices are collected by the same pass and
+the points are drawn as markers instead.
+'''
+
+
+import time
+
+import numpy as np
+
+
+# number of points binned at once, bounds the temporary arrays
+default_chunk_size = 2 ** 22
+
+
+def bin_indices(x, y, x_range, y_range, shape):
+    '''
+    Returns the flat bin index of each point of x, y in the histogram of
+    shape (n_rows, n_columns) covering x_range, y_range and the mask of the
+    points inside the histogram. NaN values are outside.
+    '''
+    n_rows, n_columns = shape
+    x_scale = n_columns / float(x_range[1] - x_range[0])
+    y_scale = n_rows / float(y_range[1] - y_range[0])
+    with np.errstate(invalid='ignore'):
+        x_bins = np.floor((x - x_range[0]) * x_scale)
+        y_bins = np.floor((y - y_range[0]) * y_scale)
+        # the upper bounds belong to the last bins
+        x_bins[x == x_range[1]] = n_columns - 1
+        y_bins[y == y_range[1]] = n_rows - 1
+        inside = (x_bins >= 0) & (x_bins < n_columns) & (y_bins >= 0) & (y_bins < n_rows)
+    flat = y_bins[inside].astype(np.intp) * n_columns + x_bins[inside].astype(np.intp)
+    return flat, inside
+
+
+## Chunked binning of the points of several series in the window
+# x_range, y_range. The indices of the points in the window are kept as
+# long as there are at most max_markers of them
+class DensityBinning(object):
+
+    def __init__(self, series_list, x_range, y_range, shape, max_markers=0,
+                 chunk_size=default_chunk_size):
+        super(DensityBinning, self).__init__()
+        self.series_list = series_list
+        self.x_range = x_range
+        self.y_range = y_range
+        self.shape = shape
+        self.max_markers = max_markers
+        self.chunk_size = chunk_size
+
+        self.counts = np.zeros(shape[0] * shape[1], dtype=np.float64)
+        self.n_inside = 0
+        # indices of the points in the window by series, None once there
+        # are more than max_markers points
+        self.markers = [[] for _ in series_list]
+
+        # index ranges left to bin by series, series with sorted X are
+        # only scanned over the visible X range
+        self._tasks = []
+        for i, series in enumerate(series_list):
+            if series.x_sorted:
+                first = int(series.x.searchsorted(x_range[0], 'left'))
+                last = int(series.x.searchsorted(x_range[1], 'right'))
+            else:
+                first, last = 0, len(series)
+            if first < last:
+                self._tasks.append([i, first, last])
+        self.n_points = sum(last - first for _, first, last in self._tasks)
+        self.n_binned = 0
+
+    @property
+    def done(self):
+        return not self._tasks
+
+    @property
+    def progress(self):
+        return float(self.n_binned) / self.n_points if self.n_points else 1.0
+
+    def bin_chunk(self):
+        '''
+        Bins the next chunk of points, returns False when there is nothing
+        left to bin.
+        '''
+        if not self._tasks:
+            return False
+        task = self._tasks[0]
+        i, first, last = task
+        end = min(first + self.chunk_size, last)
+        series = self.series_list[i]
+        x = np.asarray(series.x[first:end], dtype=np.float64)
+        y = np.asarray(series.y[first:end], dtype=np.float64)
+        flat, inside = bin_indices(x, y, self.x_range, self.y_range, self.shape)
+        self.counts += np.bincount(flat, minlength=len(self.counts))
+        self.n_inside += len(flat)
+        if self.markers is not None:
+            if self.n_inside > self.max_markers:
+                self.markers = None
+            else:
+                self.markers[i].append(first + np.flatnonzero(inside))
+
+        self.n_binned += end - first
+        if end < last:
+            task[1] = end
+        else:
+            self._tasks.pop(0)
+        return True
+
+    def run(self, max_seconds=None):
+        '''
+        Bins chunks until all the points are binned or for about
+        max_seconds, at least one chunk. Returns True when done.
+        '''
+        start = time.time()
+        while self.bin_chunk():
+            if max_seconds is not None and time.time() - start >= max_seconds:
+                break
+        return self.done
+
+    def marker_indices(self, i):
+        '''
+        Sorted indices of the points of the series i in the window, None
+        when there are too many points to draw markers.
+        '''
+        if self.markers is None:
+            return None
+        if not self.markers[i]:
+            return np.zeros(0, dtype=np.intp)
+        return np.concatenate(self.markers[i])
+
+    def image_values(self, out=None):
+        '''
+        Counts of the bins as a flat array, rows of the histogram from the
+        bottom, with NaN in the empty bins.
+        '''
+        if out is None:
+            out = np.empty_like(self.counts)
+        np.copyto(out, self.counts)
+        out[self.counts == 0] = np.nan
+        return out
@@ -0,0 +1,193 @@
+'''
+Module with the series derived from the series of a chart: moving average,
+derivative, integral and amplitude spectrum. The computations are
+vectorized over the whole series. Results are memoized by the chart, keyed
+by the source series and the version of its values and the parameters, in
+a cache bounded in bytes from which the least recently used results are
+evicted. Series which can not be computed raise ValueError.
+'''
+
+
+import collections
+
+import numpy as np
+
+from storage import UniformColumn
+
+
+# size limit in bytes of the memoized results
+default_max_bytes = 512 * 2 ** 20
+
+# number of points of the blocks of the windowed sums
+_block_size = 2 ** 16
+
+
+def _step(x):
+    '''
+    Mean step of the X column, the step of an implicit one.
+    '''
+    if isinstance(x, UniformColumn):
+        return x.step
+    return (float(x[-1]) - float(x[0])) / (len(x) - 1)
+
+
+def _owned_bytes(values):
+    # columns shared with the source series are not counted
+    return int(values.nbytes) if getattr(values, 'base', 0) is None else 0
+
+
+def moving_average(x, y, window=10, block_size=_block_size):
+    '''
+    Centered moving average of y over window points, the windows are
+    shifted inside the series at both ends. Non finite values are left
+    out of the windows holding them, windows without any finite value
+    give NaN. The sums are computed by blocks of block_size points so that
+    their rounding error does not grow with the length of the series.
+    '''
+    n_values = len(y)
+    window = max(1, min(int(window), n_values))
+    values = np.empty(n_values, dtype=np.float64)
+    for start in range(0, n_values, block_size):
+        end = min(start + block_size, n_values)
+        i = np.arange(start, end)
+        first = np.maximum(i - window // 2, 0)
+        last = np.minimum(first + window, n_values)
+        first = np.maximum(last - window, 0)
+        # points read by the windows of the block
+        low, high = int(first[0]), int(last[-1])
+        block = np.asarray(y[low:high], dtype=np.float64)
+        valid = np.isfinite(block)
+        # sums of the deviations from a value of the block, a large offset
+        # of the series cancels out of them
+        offset = block[valid][0] if valid.any() else 0.0
+        sums = np.zeros(high - low + 1, dtype=np.float64)
+        np.cumsum(np.where(valid, block - offset, 0.0), out=sums[1:])
+        counts = np.zeros(high - low + 1, dtype=np.int64)
+        np.cumsum(valid, out=counts[1:])
+        first -= low
+        last -= low
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values[start:end] = offset + (sums[last] - sums[first]) / (counts[last] - counts[first])
+    return x, values
+
+
+def derivative(x, y):
+    '''
+    Derivative of y with respect to x, centered differences inside the
+    series and one sided ones at its ends.
+    '''
+    if len(y) < 2:
+        return x, np.zeros(len(y))
+    spacing = x.step if isinstance(x, UniformColumn) else np.asarray(x, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return x, np.gradient(np.asarray(y, dtype=np.float64), spacing)
+
+
+def integral(x, y):
+    '''
+    Cumulative integral of y along x by the trapezoidal rule, 0 at the
+    first point.
+    '''
+    values = np.zeros(len(y), dtype=np.float64)
+    if len(y) < 2:
+        return x, values
+    y = np.asarray(y, dtype=np.float64)
+    widths = x.step if isinstance(x, UniformColumn) else np.diff(np.asarray(x, dtype=np.float64))
+    np.cumsum((y[1:] + y[:-1]) * widths / 2.0, out=values[1:])
+    return x, values
+
+
+def spectrum(x, y):
+    '''
+    Amplitude spectrum of y, which is assumed to be sampled with the mean
+    step of x. The mean is removed first. The frequencies are an implicit
+    evenly spaced column.
+    '''
+    n_values = len(y)
+    if n_values < 2:
+        return UniformColumn(0.0, 1.0, 0), np.zeros(0)
+    step = _step(x)
+    if not np.isfinite(step) or step <= 0:
+        raise ValueError('The spectrum needs an increasing X, the mean step of X is {0}'.format(step))
+    y = np.asarray(y, dtype=np.float64)
+    amplitudes = np.abs(np.fft.rfft(y - y.mean())) * (2.0 / n_values)
+    return UniformColumn(0.0, 1.0 / (n_values * step), len(amplitudes)), amplitudes
+
+
+# operation: (label, function, names of the parameters)
+operations = collections.OrderedDict([
+    ('moving_average', ('Moyenne glissante', moving_average, ('window', ))),
+    ('derivative', ('Derivee', derivative, ())),
+    ('integral', ('Integrale', integral, ())),
+    ('fft', ('Spectre (FFT)', spectrum, ())),
+])
+
+
+def compute(operation, x, y, **params):
+    '''
+    Returns the x, y arrays of the series derived from x, y by the
+    operation, a key of operations.
+    '''
+    return operations[operation][1](x, y, **params)
+
+
+def derived_name(operation, source_name, params=None):
+    label = operations[operation][0]
+    if params:
+        values = ', '.join('{0}'.format(params[name]) for name in operations[operation][2] if name in params)
+        return '{0}({1}; {2})'.format(label, source_name, values)
+    return '{0}({1})'.format(label, source_name)
+
+
+def params_key(params):
+    return tuple(sorted(params.items())) if params else ()
+
+
+## Memo of the derived series bounded in bytes, the least recently used
+# results are evicted first
+class DerivedCache(object):
+
+    def __init__(self, max_bytes=default_max_bytes):
+        super(DerivedCache, self).__init__()
+        self.max_bytes = max_bytes
+        self.n_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, compute_function):
+        '''
+        Returns the memoized result of key, compute_function() when there
+        is none, which is then memoized.
+        '''
+        if key in self._entries:
+            self.hits += 1
+            result, n_bytes = self._entries.pop(key)
+            self._entries[key] = (result, n_bytes)
+            return result
+        self.misses += 1
+        result = compute_function()
+        n_bytes = sum(_owned_bytes(values) for values in result)
+        self._entries[key] = (result, n_bytes)
+        self.n_bytes += n_bytes
+        # the newest result is kept even when it is larger than the limit
+        while self.n_bytes > self.max_bytes and len(self._entries) > 1:
+            _, (_, evicted_bytes) = self._entries.popitem(last=False)
+            self.n_bytes -= evicted_bytes
+        return result
+
+    def retain(self, keep):
+        '''
+        Drops the results whose key does not satisfy keep(key), e.g. the
+        results computed from data which was replaced.
+        '''
+        for key in [key for key in self._entries if not keep(key)]:
+            _, n_bytes = self._entries.pop(key)
+            self.n_bytes -= n_bytes
+
+    def clear(self):
+        self._entries.clear()
+        self.n_bytes = 0
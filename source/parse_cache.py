@@ -0,0 +1,151 @@
+'''
+Module with the on-disk cache of parsed csv files. Parsed columns are
+stored as .npy files which are memory mapped when the same file is opened
+again, so that a reopen costs neither parsing nor copying. Entries are
+keyed by the path, size and modification time of the file and by a hash
+of samples of its content; the least recently used entries are evicted
+when the cache grows over its size limit.
+'''
+
+
+import os
+import json
+import shutil
+import hashlib
+
+import numpy as np
+
+from csv_loader import ParsedColumns
+
+
+CACHE_VERSION = 2
+
+
+def fast_content_hash(file_path, sample_size=2 ** 16, n_samples=8):
+    '''
+    Hash of n_samples blocks of sample_size bytes evenly spread over the
+    file, first and last blocks included.
+    '''
+    file_size = os.path.getsize(file_path)
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        if file_size <= sample_size * n_samples:
+            digest.update(f.read())
+        else:
+            step = (file_size - sample_size) // (n_samples - 1)
+            for i in range(n_samples):
+                f.seek(i * step)
+                digest.update(f.read(sample_size))
+    return digest.hexdigest()
+
+
+def _directory_size(path):
+    size = 0
+    for name in os.listdir(path):
+        size += os.path.getsize(os.path.join(path, name))
+    return size
+
+
+## Cache of parsed csv files stored in a directory, one sub-directory by
+# entry
+class ParseCache(object):
+
+    meta_name = 'meta.json'
+
+    def __init__(self, directory, max_bytes):
+        super(ParseCache, self).__init__()
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def key(self, file_path, n_columns, delimiter):
+        stat = os.stat(file_path)
+        parts = [CACHE_VERSION, os.path.abspath(file_path), stat.st_size, stat.st_mtime,
+                 n_columns, repr(delimiter), fast_content_hash(file_path)]
+        return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+    def load(self, file_path, n_columns=2, delimiter=b','):
+        '''
+        Returns the csv_loader.ParsedColumns of the file, with memory mapped
+        columns, or None when the file is not in the cache.
+        '''
+        entry = os.path.join(self.directory, self.key(file_path, n_columns, delimiter))
+        meta_path = os.path.join(entry, self.meta_name)
+        if not os.path.isfile(meta_path):
+            return None
+        try:
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+            columns = [np.load(os.path.join(entry, 'column_{0:d}.npy'.format(i)), mmap_mode='r')
+                       for i in range(meta['n_columns'])]
+            bad_rows = np.load(os.path.join(entry, 'bad_rows.npy'))
+        except (IOError, OSError, ValueError, KeyError):
+            return None
+        # the modification time of the meta file is the last access time, a
+        # read only cache or an entry evicted meanwhile is still read
+        try:
+            os.utime(meta_path, None)
+        except OSError:
+            pass
+
+        parsed = ParsedColumns(columns, bad_rows, meta['n_rows'], meta['n_lines'])
+        parsed.n_bytes = meta['n_bytes']
+        parsed.names = meta.get('names', [])
+        return parsed
+
+    def store(self, file_path, parsed, n_columns=2, delimiter=b','):
+        key = self.key(file_path, n_columns, delimiter)
+        entry = os.path.join(self.directory, key)
+        tmp_entry = entry + '.tmp'
+        if os.path.isdir(tmp_entry):
+            shutil.rmtree(tmp_entry)
+        os.makedirs(tmp_entry)
+
+        for i, column in enumerate(parsed.columns):
+            np.save(os.path.join(tmp_entry, 'column_{0:d}.npy'.format(i)), column)
+        np.save(os.path.join(tmp_entry, 'bad_rows.npy'), parsed.bad_rows)
+        meta = {'source': os.path.abspath(file_path),
+                'n_columns': len(parsed.columns),
+                'n_rows': parsed.n_rows,
+                'n_lines': parsed.n_lines,
+                'n_bytes': parsed.n_bytes,
+                'names': parsed.names}
+        with open(os.path.join(tmp_entry, self.meta_name), 'w') as f:
+            json.dump(meta, f)
+
+        if os.path.isdir(entry):
+            shutil.rmtree(entry)
+        os.rename(tmp_entry, entry)
+        self.evict(keep=key)
+
+    def entries(self):
+        '''
+        List of (last access time, size, path) of the complete entries.
+        '''
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            meta_path = os.path.join(path, self.meta_name)
+            if name.endswith('.tmp') or not os.path.isfile(meta_path):
+                continue
+            entries.append((os.path.getmtime(meta_path), _directory_size(path), path))
+        return entries
+
+    def evict(self, keep=None):
+        '''
+        Removes the least recently used entries until the cache size is
+        below max_bytes. The entry keep is never removed.
+        '''
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if os.path.basename(path) == keep:
+                continue
+            try:
+                shutil.rmtree(path)
+            except OSError:
+                continue
+            total -= size
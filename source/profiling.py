@@ -0,0 +1,186 @@
+'''
+Module with the lightweight instrumentation of the hot paths. Code is
+wrapped in named spans; when the tracer is enabled each span records its
+start, duration, thread and, optionally, the python memory allocated
+during the span. Recorded events are sent to sinks (e.g. the logger) and
+can be exported as json or in the chrome trace format (chrome://tracing).
+
+When the tracer is disabled a span costs one attribute lookup.
+'''
+
+
+import os
+import json
+import time
+import threading
+import functools
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+## Context manager returned by disabled tracers
+class _NullSpan(object):
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_null_span = _NullSpan()
+
+
+## Timed span of a tracer
+class _Span(object):
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.memory = self.tracer.traced_memory()
+        self.start = time.time()
+        return self
+
+    def __exit__(self, *exc_info):
+        end = time.time()
+        event = {'name': self.name,
+                 'start': self.start - self.tracer.origin,
+                 'duration': end - self.start,
+                 'thread': threading.current_thread().name,
+                 'args': self.args}
+        if self.memory is not None:
+            event['memory_delta'] = self.tracer.traced_memory() - self.memory
+        self.tracer.record(event)
+        return False
+
+
+## Collector of the spans of the application
+class Tracer(object):
+
+    def __init__(self, max_events=100000):
+        super(Tracer, self).__init__()
+        self.enabled = False
+        self.max_events = max_events
+        self.events = []
+        self.origin = time.time()
+        self._sinks = []
+        self._lock = threading.Lock()
+        self._trace_memory = False
+
+    def enable(self, trace_memory=False):
+        self._trace_memory = trace_memory and tracemalloc is not None
+        if self._trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        if self._trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._trace_memory = False
+
+    def clear(self):
+        with self._lock:
+            self.events = []
+            self.origin = time.time()
+
+    def add_sink(self, sink):
+        if callable(sink):
+            self._sinks.append(sink)
+
+    def detach(self):
+        '''
+        Disables the tracer and drops its sinks, e.g. in a worker process
+        which inherited the tracer of the application.
+        '''
+        self.disable()
+        self._sinks = []
+
+    def traced_memory(self):
+        if not self._trace_memory:
+            return None
+        return tracemalloc.get_traced_memory()[0]
+
+    def span(self, name, **args):
+        if not self.enabled:
+            return _null_span
+        return _Span(self, name, args)
+
+    def traced(self, name):
+        '''
+        Decorator wrapping each call of the function in a span.
+        '''
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                with _Span(self, name, {}):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def record_span(self, name, start, duration, thread=None, args=None):
+        '''
+        Records a span timed elsewhere, e.g. in a worker process. start is
+        a time.time() value, args the dict of the arguments of the span.
+        '''
+        if not self.enabled:
+            return
+        self.record({'name': name,
+                     'start': start - self.origin,
+                     'duration': duration,
+                     'thread': thread or threading.current_thread().name,
+                     'args': args or {}})
+
+    def record(self, event):
+        with self._lock:
+            if len(self.events) < self.max_events:
+                self.events.append(event)
+        for sink in self._sinks:
+            sink(event)
+
+    def export_json(self, file_path):
+        with self._lock:
+            events = list(self.events)
+        with open(file_path, 'w') as f:
+            json.dump({'events': events}, f, indent=1)
+
+    def export_chrome_trace(self, file_path):
+        with self._lock:
+            events = list(self.events)
+        pid = os.getpid()
+        trace_events = []
+        for event in events:
+            args = dict(event['args'])
+            if 'memory_delta' in event:
+                args['memory_delta'] = event['memory_delta']
+            trace_events.append({'name': event['name'],
+                                 'cat': 'plots',
+                                 'ph': 'X',
+                                 'ts': 1e6 * event['start'],
+                                 'dur': 1e6 * event['duration'],
+                                 'pid': pid,
+                                 'tid': event['thread'],
+                                 'args': args})
+        with open(file_path, 'w') as f:
+            json.dump({'traceEvents': trace_events, 'displayTimeUnit': 'ms'}, f)
+
+    def export(self, file_path):
+        '''
+        Exports in the chrome trace format when the file name ends with
+        .trace.json or .trace, as plain json otherwise.
+        '''
+        if file_path.endswith('.trace.json') or file_path.endswith('.trace'):
+            self.export_chrome_trace(file_path)
+        else:
+            self.export_json(file_path)
+
+
+tracer = Tracer()
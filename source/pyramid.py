@@ -0,0 +1,287 @@
+'''
+Module with the multi-resolution min/max index of a column. Level k of the
+pyramid stores, for each block of base_block * 2 ** k consecutive values,
+the indices of its minimum and of its maximum, so that the extrema of any
+range of indices are found from O(log n) blocks and the decimation of any
+window at screen resolution costs O(pixels) instead of O(n). NaN values are
+ignored like by np.fmin and np.fmax: they are only the extrema of blocks
+holding nothing else.
+
+Pyramids of the columns of a file are persisted next to it as a .npy file
+that is memory mapped when the file is reopened, along with whether its
+first column, the X column, is sorted.
+'''
+
+
+import os
+import json
+
+import numpy as np
+
+
+# version 2: NaN values are ignored, version 3: sortedness of the X column
+PYRAMID_VERSION = 3
+
+default_base_block = 64
+
+# number of values compared at once by is_sorted, bounds the temporary
+# arrays
+_sorted_block = 2 ** 20
+
+
+def is_sorted(x):
+    '''
+    True when the values of x never decrease, checked by blocks.
+    '''
+    for first in range(0, len(x) - 1, _sorted_block):
+        last = min(first + _sorted_block + 1, len(x))
+        if not np.all(x[first + 1:last] >= x[first:last - 1]):
+            return False
+    return True
+
+
+def block_extrema(blocks):
+    '''
+    Indices of the minimum and of the maximum of each row of the 2-D array
+    blocks, NaN values ignored. Only the rows holding NaN values are copied.
+    '''
+    i_min = np.argmin(blocks, axis=1)
+    i_max = np.argmax(blocks, axis=1)
+    rows = np.arange(len(blocks))
+    # argmin and argmax return the first NaN of the rows holding one
+    with_nan = np.flatnonzero(np.isnan(blocks[rows, i_min]))
+    if len(with_nan):
+        filled = blocks[with_nan]
+        nan = np.isnan(filled)
+        i_min[with_nan] = np.argmin(np.where(nan, np.inf, filled), axis=1)
+        i_max[with_nan] = np.argmax(np.where(nan, -np.inf, filled), axis=1)
+    return i_min, i_max
+
+
+def _is_lower(value, other):
+    # value < other where NaN values are never lower than numbers
+    return value < other or (other != other and value == value)
+
+
+def _pairwise_extrema(values, i_min, i_max):
+    n_pairs = len(i_min) // 2
+    a_min, b_min = i_min[0:2 * n_pairs:2], i_min[1:2 * n_pairs:2]
+    a_max, b_max = i_max[0:2 * n_pairs:2], i_max[1:2 * n_pairs:2]
+    a_values, b_values = values[a_min], values[b_min]
+    new_min = np.where((b_values < a_values) | np.isnan(a_values), b_min, a_min)
+    a_values, b_values = values[a_max], values[b_max]
+    new_max = np.where((b_values > a_values) | np.isnan(a_values), b_max, a_max)
+    if len(i_min) % 2:
+        new_min = np.append(new_min, i_min[-1])
+        new_max = np.append(new_max, i_max[-1])
+    return new_min, new_max
+
+
+def level_sizes(n_values, base_block=default_base_block):
+    sizes = []
+    n_blocks = -(-n_values // base_block)
+    while n_blocks:
+        sizes.append(n_blocks)
+        if n_blocks == 1:
+            break
+        n_blocks = -(-n_blocks // 2)
+    return sizes
+
+
+## Min/max pyramid of one column
+class MinMaxPyramid(object):
+
+    def __init__(self, values, levels, base_block=default_base_block):
+        super(MinMaxPyramid, self).__init__()
+        self.values = values
+        # list of (indices of minima, indices of maxima) for each level
+        self.levels = levels
+        self.base_block = base_block
+        # whether the values are sorted, None when unknown
+        self.sorted = None
+
+    @classmethod
+    def build(cls, values, base_block=default_base_block):
+        n_values = len(values)
+        n_full = n_values // base_block
+        blocks = values[:n_full * base_block].reshape(n_full, base_block)
+        offsets = np.arange(n_full, dtype=np.int64) * base_block
+        block_min, block_max = block_extrema(blocks)
+        i_min = offsets + block_min
+        i_max = offsets + block_max
+        if n_full * base_block < n_values:
+            tail_min, tail_max = block_extrema(values[n_full * base_block:].reshape(1, -1))
+            i_min = np.append(i_min, n_full * base_block + tail_min)
+            i_max = np.append(i_max, n_full * base_block + tail_max)
+
+        levels = []
+        while len(i_min):
+            levels.append((i_min, i_max))
+            if len(i_min) == 1:
+                break
+            i_min, i_max = _pairwise_extrema(values, i_min, i_max)
+        return cls(values, levels, base_block)
+
+    def block_size(self, level):
+        return self.base_block * 2 ** level
+
+    def _raw_extrema(self, first, last):
+        i_min, i_max = block_extrema(self.values[first:last].reshape(1, -1))
+        return first + int(i_min[0]), first + int(i_max[0])
+
+    def range_extrema(self, first, last):
+        '''
+        Indices of the minimum and of the maximum of the values in the range
+        first..last-1, found from the largest aligned blocks of the range.
+        '''
+        n_values = len(self.values)
+        best_min = best_max = None
+        position = first
+        while position < last:
+            level = None
+            for k in range(len(self.levels) - 1, -1, -1):
+                size = self.block_size(k)
+                if position % size == 0 and min(position + size, n_values) <= last:
+                    level = k
+                    break
+            if level is None:
+                end = min(last, (position // self.base_block + 1) * self.base_block)
+                i_min, i_max = self._raw_extrema(position, end)
+            else:
+                block = position // self.block_size(level)
+                i_min = int(self.levels[level][0][block])
+                i_max = int(self.levels[level][1][block])
+                end = min(position + self.block_size(level), n_values)
+            if best_min is None or _is_lower(self.values[i_min], self.values[best_min]):
+                best_min = i_min
+            if best_max is None or _is_lower(-self.values[i_max], -self.values[best_max]):
+                best_max = i_max
+            position = end
+        return best_min, best_max
+
+    def window_indices(self, first, last, n_buckets):
+        '''
+        Sorted indices of the minima and maxima of blocks of about
+        (last - first) / n_buckets values covering the range first..last-1.
+        Returns None when the range is too small to use the pyramid.
+        '''
+        target = (last - first) // n_buckets
+        level = None
+        for k in range(len(self.levels)):
+            if self.block_size(k) <= target:
+                level = k
+        if level is None:
+            return None
+
+        size = self.block_size(level)
+        n_values = len(self.values)
+        first_block = -(-first // size)
+        last_block = last // size
+        if last == n_values:
+            last_block = len(self.levels[level][0])
+        i_min = self.levels[level][0][first_block:last_block]
+        i_max = self.levels[level][1][first_block:last_block]
+
+        indices = [np.minimum(i_min, i_max), np.maximum(i_min, i_max)]
+        indices = [np.column_stack(indices).ravel()]
+        left_end = min(first_block * size, last)
+        if first < left_end:
+            indices.insert(0, np.unique(self.range_extrema(first, left_end)))
+        right_start = max(min(last_block * size, n_values), left_end)
+        if right_start < last:
+            indices.append(np.unique(self.range_extrema(right_start, last)))
+        return np.concatenate(indices).astype(np.int64)
+
+    @property
+    def extrema(self):
+        top_min, top_max = self.levels[-1]
+        return int(top_min[0]), int(top_max[0])
+
+
+def pyramid_paths(source_path):
+    return source_path + '.pyramid.npy', source_path + '.pyramid.json'
+
+
+def _source_signature(source_path):
+    stat = os.stat(source_path)
+    return {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+
+def save_pyramids(source_path, pyramids):
+    '''
+    Writes the pyramids of the columns of the file source_path next to it.
+    All the levels of all the columns are stored in one (n_columns, 2,
+    n_blocks) int64 array.
+    '''
+    data_path, meta_path = pyramid_paths(source_path)
+    stacked = np.stack([np.stack([np.concatenate([l[0] for l in p.levels]),
+                                  np.concatenate([l[1] for l in p.levels])])
+                        for p in pyramids])
+    np.save(data_path, stacked)
+    meta = _source_signature(source_path)
+    meta.update({'version': PYRAMID_VERSION,
+                 'n_values': len(pyramids[0].values),
+                 'n_columns': len(pyramids),
+                 'base_block': pyramids[0].base_block,
+                 'x_sorted': pyramids[0].sorted})
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f)
+
+
+def load_pyramids(source_path, columns):
+    '''
+    Memory maps the persisted pyramids of the columns of source_path.
+    Returns None when they are missing or older than the file.
+    '''
+    data_path, meta_path = pyramid_paths(source_path)
+    if not os.path.isfile(data_path) or not os.path.isfile(meta_path):
+        return None
+    with open(meta_path, 'r') as f:
+        meta = json.load(f)
+
+    expected = _source_signature(source_path)
+    expected.update({'version': PYRAMID_VERSION,
+                     'n_values': len(columns[0]) if columns else 0,
+                     'n_columns': len(columns)})
+    for key, value in expected.items():
+        if meta.get(key) != value:
+            return None
+
+    base_block = meta['base_block']
+    stacked = np.load(data_path, mmap_mode='r')
+    pyramids = []
+    for c, values in enumerate(columns):
+        levels = []
+        offset = 0
+        for n_blocks in level_sizes(len(values), base_block):
+            levels.append((stacked[c, 0, offset:offset + n_blocks],
+                           stacked[c, 1, offset:offset + n_blocks]))
+            offset += n_blocks
+        pyramids.append(MinMaxPyramid(values, levels, base_block))
+    pyramids[0].sorted = meta.get('x_sorted')
+    return pyramids
+
+
+def load_or_build_pyramids(source_path, columns):
+    '''
+    Returns the pyramids of the columns parsed from source_path, built and
+    persisted next to the file when no up to date ones exist. The pyramid
+    of the first column tells whether it is sorted, so that the chart does
+    not scan the X column.
+    '''
+    if not columns or not len(columns[0]):
+        return []
+    try:
+        pyramids = load_pyramids(source_path, columns)
+    except (IOError, OSError, ValueError):
+        pyramids = None
+    if pyramids is not None:
+        return pyramids
+
+    pyramids = [MinMaxPyramid.build(values) for values in columns]
+    pyramids[0].sorted = is_sorted(columns[0])
+    try:
+        save_pyramids(source_path, pyramids)
+    except (IOError, OSError):
+        pass
+    return pyramids
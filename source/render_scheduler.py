@@ -0,0 +1,74 @@
+'''
+Module with the scheduler of the renders of the chart. Render requests
+only mark the chart as dirty, the frame is drawn once per iteration of
+the qt event loop and no more often than max_fps frames per second.
+'''
+
+
+import time
+import collections
+
+from PyQt4 import QtCore
+
+
+## Coalesces and throttles the calls of a render function and collects
+# statistics on the duration of the frames
+class RenderScheduler(QtCore.QObject):
+
+    def __init__(self, render_function, max_fps=None, history=100, parent=None):
+        super(RenderScheduler, self).__init__(parent)
+        self.render_function = render_function
+        self.max_fps = max_fps
+
+        self.n_requests = 0
+        self.n_frames = 0
+        self.frame_times = collections.deque(maxlen=history)
+
+        self._dirty = False
+        self._last_frame_start = None
+
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.flush)
+
+    @property
+    def min_interval(self):
+        return 1.0 / self.max_fps if self.max_fps else 0.0
+
+    def request(self):
+        self.n_requests += 1
+        self._dirty = True
+        if self._timer.isActive():
+            return
+        delay = 0.0
+        if self._last_frame_start is not None:
+            elapsed = time.time() - self._last_frame_start
+            delay = max(self.min_interval - elapsed, 0.0)
+        self._timer.start(int(1000 * delay))
+
+    def flush(self):
+        '''
+        Draws the pending frame now, if any.
+        '''
+        self._timer.stop()
+        if not self._dirty:
+            return
+        self._dirty = False
+        self._last_frame_start = time.time()
+        self.render_function()
+        self.frame_times.append(time.time() - self._last_frame_start)
+        self.n_frames += 1
+
+    @property
+    def statistics(self):
+        stats = {'n_requests': self.n_requests,
+                 'n_frames': self.n_frames,
+                 'last_frame_ms': 0.0,
+                 'mean_frame_ms': 0.0,
+                 'max_frame_ms': 0.0}
+        if self.frame_times:
+            frame_times = list(self.frame_times)
+            stats['last_frame_ms'] = 1000 * frame_times[-1]
+            stats['mean_frame_ms'] = 1000 * sum(frame_times) / len(frame_times)
+            stats['max_frame_ms'] = 1000 * max(frame_times)
+        return stats
@@ -0,0 +1,170 @@
+'''
+Module with the storage policy of the columns of the charts. Columns can be
+stored as float32 when the values survive the conversion within a relative
+tolerance, and an evenly spaced X column is stored implicitly as a start
+and a step: only the slices which are actually drawn or exported are
+computed.
+'''
+
+
+import numpy as np
+
+
+# number of values checked at once, bounds the temporary arrays
+_check_block = 2 ** 20
+
+
+## Evenly spaced column start + step * i, i = 0..n_values-1, which behaves
+# like a read only float64 numpy array for len, indexing, slicing and
+# searchsorted
+class UniformColumn(object):
+
+    dtype = np.dtype(np.float64)
+    nbytes = 0
+    ndim = 1
+
+    def __init__(self, start, step, n_values):
+        super(UniformColumn, self).__init__()
+        self.start = float(start)
+        self.step = float(step)
+        self.n_values = int(n_values)
+
+    def __len__(self):
+        return self.n_values
+
+    @property
+    def shape(self):
+        return (self.n_values,)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.start + self.step * np.arange(*index.indices(self.n_values), dtype=np.float64)
+        if np.isscalar(index):
+            index = int(index)
+            if index < 0:
+                index += self.n_values
+            if not 0 <= index < self.n_values:
+                raise IndexError('index {0:d} is out of bounds'.format(index))
+            return self.start + self.step * index
+        indices = np.asarray(index)
+        if indices.dtype == bool:
+            indices = np.flatnonzero(indices)
+        indices = np.where(indices < 0, indices + self.n_values, indices)
+        return self.start + self.step * indices.astype(np.float64)
+
+    def __array__(self, dtype=None):
+        values = self[:]
+        return values if dtype is None else values.astype(dtype)
+
+    def searchsorted(self, value, side='left'):
+        if not self.n_values:
+            return 0
+        index = int(np.clip(np.ceil((value - self.start) / self.step), 0, self.n_values))
+        # the rounding of the division is corrected on the computed values
+        if side == 'left':
+            while index > 0 and self[index - 1] >= value:
+                index -= 1
+            while index < self.n_values and self[index] < value:
+                index += 1
+        else:
+            while index > 0 and self[index - 1] > value:
+                index -= 1
+            while index < self.n_values and self[index] <= value:
+                index += 1
+        return index
+
+
+def detect_uniform(values, rtol=1e-6):
+    '''
+    Returns the UniformColumn equal to values within rtol * step, None when
+    the values are not evenly spaced and increasing.
+    '''
+    if isinstance(values, UniformColumn):
+        return values
+    n_values = len(values)
+    if n_values < 3:
+        return None
+    start = float(values[0])
+    step = (float(values[-1]) - start) / (n_values - 1)
+    if not step > 0:
+        return None
+    for first in range(0, n_values, _check_block):
+        last = min(first + _check_block, n_values)
+        expected = start + step * np.arange(first, last, dtype=np.float64)
+        if not np.all(np.abs(values[first:last] - expected) <= rtol * step):
+            return None
+    return UniformColumn(start, step, n_values)
+
+
+def fits_float32(values, rtol=1e-6):
+    '''
+    True when the float32 conversion of values changes them by at most
+    rtol times the largest absolute value.
+    '''
+    if values.dtype == np.float32:
+        return True
+    if not len(values):
+        return True
+    scale = float(np.nanmax(np.abs(values)))
+    if not np.isfinite(scale) or scale > np.finfo(np.float32).max:
+        return False
+    for first in range(0, len(values), _check_block):
+        block = values[first:first + _check_block]
+        error = np.abs(block.astype(np.float32).astype(np.float64) - block)
+        if np.any(error > rtol * scale):
+            return False
+    return True
+
+
+## Choice of the storage of the columns of a chart
+class StoragePolicy(object):
+
+    def __init__(self, float32=False, float32_tolerance=1e-6, implicit_x=True, uniform_tolerance=1e-6):
+        super(StoragePolicy, self).__init__()
+        self.float32 = float32
+        self.float32_tolerance = float32_tolerance
+        self.implicit_x = implicit_x
+        self.uniform_tolerance = uniform_tolerance
+
+    @classmethod
+    def from_config(cls, config, implicit_x=True):
+        '''
+        Policy of the ui_config.ConfigObject config. implicit_x False keeps
+        the X columns as arrays, e.g. for overlaid tables.
+        '''
+        return cls(config.float32_storage, config.float32_tolerance,
+                   implicit_x and config.implicit_uniform_x, config.uniform_x_tolerance)
+
+    def store_x(self, values):
+        if self.implicit_x:
+            uniform = detect_uniform(values, self.uniform_tolerance)
+            if uniform is not None:
+                return uniform
+        return values
+
+    def store_y(self, values):
+        if self.float32 and values.dtype != np.float32 and fits_float32(values, self.float32_tolerance):
+            return values.astype(np.float32)
+        return values
+
+    def store_columns(self, columns):
+        '''
+        Returns the stored columns, X first. The checks and conversions are
+        O(n) passes, they are run by the loading threads.
+        '''
+        if not columns:
+            return columns
+        return [self.store_x(columns[0])] + [self.store_y(values) for values in columns[1:]]
+
+
+def describe_storage(column):
+    if isinstance(column, UniformColumn):
+        return 'implicite'
+    return str(np.dtype(column.dtype))
+
+
+def memory_report(names, columns):
+    '''
+    List of (name, storage, bytes) of the columns.
+    '''
+    return [(name, describe_storage(column), int(column.nbytes)) for name, column in zip(names, columns)]
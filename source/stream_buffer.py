@@ -0,0 +1,72 @@
+'''
+Module with the storage of columns that grow by appending rows. The valid
+values are always a contiguous numpy view which is shared with the vtk
+array of the column, so appending does not rebuild the vtk table.
+'''
+
+
+import numpy as np
+
+
+## Growable column of values. When capacity is set the column behaves as a
+# ring buffer: the oldest values are evicted to keep at most capacity values
+class ColumnBuffer(object):
+
+    def __init__(self, values=None, capacity=None, dtype=np.float64):
+        super(ColumnBuffer, self).__init__()
+        self.capacity = capacity
+        self.dtype = dtype
+        values = np.zeros(0, dtype=dtype) if values is None else np.asarray(values, dtype=dtype)
+        if capacity is not None:
+            values = values[-capacity:] if capacity else values[:0]
+        # storage is twice as large as the values so that the compaction of
+        # a full ring buffer happens once per capacity appended values
+        size = 2 * (capacity if capacity is not None else len(values))
+        self._data = np.empty(max(size, 16), dtype=dtype)
+        self._data[:len(values)] = values
+        self._start = 0
+        self._end = len(values)
+
+    def __len__(self):
+        return self._end - self._start
+
+    @property
+    def values(self):
+        return self._data[self._start:self._end]
+
+    def append(self, new_values):
+        '''
+        Appends new_values at the end of the column. Returns the number of
+        values evicted from the beginning of the column.
+        '''
+        new_values = np.asarray(new_values, dtype=self.dtype).ravel()
+        n_new = len(new_values)
+        evicted = 0
+        if self.capacity is not None:
+            if n_new >= self.capacity:
+                evicted = len(self)
+                new_values = new_values[n_new - self.capacity:]
+                n_new = len(new_values)
+                self._start = self._end = 0
+            else:
+                evicted = max(len(self) + n_new - self.capacity, 0)
+                self._start += evicted
+
+        if self._end + n_new > len(self._data):
+            live = self.values
+            if self.capacity is not None:
+                size = len(self._data)
+            else:
+                size = max(2 * (len(live) + n_new), 16)
+            if size != len(self._data):
+                data = np.empty(size, dtype=self.dtype)
+            else:
+                data = self._data
+            data[:len(live)] = live
+            self._data = data
+            self._start = 0
+            self._end = len(live)
+
+        self._data[self._end:self._end + n_new] = new_values
+        self._end += n_new
+        return evicted
@@ -0,0 +1,110 @@
+'''
+Module with the export of the columns of a chart table to files. Columns
+are read as numpy arrays and written by blocks of rows, so that the memory
+used by an export does not depend on the size of the table.
+
+Supported formats, chosen from the file extension:
+    .txt - tab separated text with a header line of column names
+    .npy - 2D float64 numpy array (n_rows, n_columns)
+    .npz - numpy archive with one array per column
+    .bin - raw little endian float64 values, row after row
+'''
+
+
+import os
+import zipfile
+import tempfile
+
+import numpy as np
+
+
+default_chunk_rows = 2 ** 18
+
+# 17 significant digits are enough for any float64 to be read back
+# exactly
+text_float_format = '%.17g'
+
+
+def _iter_blocks(columns, chunk_rows):
+    n_rows = len(columns[0]) if columns else 0
+    for first in range(0, n_rows, chunk_rows):
+        last = min(first + chunk_rows, n_rows)
+        yield np.column_stack([np.asarray(c[first:last], dtype=np.float64) for c in columns])
+
+
+def write_text(file_path, names, columns, chunk_rows=default_chunk_rows):
+    line_format = '\t'.join([text_float_format] * len(columns)) + '\n'
+    with open(file_path, 'w') as f:
+        f.write('\t'.join(names) + '\n')
+        for block in _iter_blocks(columns, chunk_rows):
+            # one formatting operation per block instead of one per value
+            f.write((line_format * len(block)) % tuple(block.ravel().tolist()))
+
+
+def write_npy(file_path, names, columns, chunk_rows=default_chunk_rows):
+    n_rows = len(columns[0]) if columns else 0
+    header = {'descr': np.lib.format.dtype_to_descr(np.dtype('<f8')),
+              'fortran_order': False,
+              'shape': (n_rows, len(columns))}
+    with open(file_path, 'wb') as f:
+        np.lib.format.write_array_header_1_0(f, header)
+        for block in _iter_blocks(columns, chunk_rows):
+            f.write(block.astype('<f8').tobytes())
+
+
+def write_npz(file_path, names, columns, chunk_rows=default_chunk_rows):
+    arrays = {}
+    for name, column in zip(names, columns):
+        key = name or 'column'
+        suffix = 1
+        while key in arrays:
+            suffix += 1
+            key = '{0}_{1:d}'.format(name or 'column', suffix)
+        arrays[key] = column
+    # each column is written by blocks to a temporary .npy file which is
+    # then copied into the archive, an implicit column is never
+    # materialized as a whole
+    tmp_dir = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(file_path)))
+    tmp_path = os.path.join(tmp_dir, 'column.npy')
+    try:
+        with zipfile.ZipFile(file_path, 'w', zipfile.ZIP_STORED, allowZip64=True) as archive:
+            for key, column in arrays.items():
+                _write_npy_column(tmp_path, column, chunk_rows)
+                archive.write(tmp_path, key + '.npy')
+                os.remove(tmp_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        os.rmdir(tmp_dir)
+
+
+def _write_npy_column(file_path, column, chunk_rows):
+    header = {'descr': np.lib.format.dtype_to_descr(np.dtype(column.dtype)),
+              'fortran_order': False,
+              'shape': (len(column), )}
+    with open(file_path, 'wb') as f:
+        np.lib.format.write_array_header_1_0(f, header)
+        for first in range(0, len(column), chunk_rows):
+            f.write(np.ascontiguousarray(column[first:first + chunk_rows]).tobytes())
+
+
+def write_raw(file_path, names, columns, chunk_rows=default_chunk_rows):
+    with open(file_path, 'wb') as f:
+        for block in _iter_blocks(columns, chunk_rows):
+            f.write(block.astype('<f8').tobytes())
+
+
+writers = {'.txt': write_text,
+           '.npy': write_npy,
+           '.npz': write_npz,
+           '.bin': write_raw}
+
+
+def export_columns(file_path, names, columns, chunk_rows=default_chunk_rows):
+    '''
+    Writes the columns to file_path in the format given by its extension,
+    tab separated text for unknown extensions.
+    '''
+    extension = os.path.splitext(file_path)[1].lower()
+    writer = writers.get(extension, write_text)
+    writer(file_path, names, columns, chunk_rows)
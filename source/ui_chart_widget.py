@@ -4,7 +4,6 @@ Module with classes needed for chart widget gui
 
 
 import os
-import vtk
 
 from PyQt4 import QtGui, QtCore
 
@@ -13,57 +12,17 @@ from vtk_chart import VTKChartWidget
 from ui_config import config
 
 import ui_widgets
+import compression
+import data_bridge
+import table_export
 
+from ui_data_table import UiDataTableDialog
+from ui_derived_series import UiDerivedSeriesDialog
+from ui_series_options import UiSeriesOptionsModel, UiSeriesOptionsView
+from ui_workers import UiCsvLoadThread, UiMultiCsvLoadThread
+from ui_file_follower import UiFileFollower
 
-## Small widget needed for selection of the color, style and thickness
-# of plot lines
-class UiPlotLineOptionsGroupBox(ui_widgets.UiQGroupBox):
-
-    LineTypes = ['SOLID_LINE',
-                 'DASH_LINE',
-                 'DOT_LINE',
-                 'DASH_DOT_LINE',
-                 'DASH_DOT_DOT_LINE',
-                 'DENSE_DOT_LINE']
-
-    def __init__(self, serie_id=1):
-        title = 'Serie {0:d}'.format(serie_id)
-        super(UiPlotLineOptionsGroupBox, self).__init__(title, bold=True, height=100, width=360)
-
-        label_color = ui_widgets.UiQLabel('Coleur', width=150, font_size=12, alignment='AlignVCenter|AlignRight')
-        label_epaiseur = ui_widgets.UiQLabel('Epaisseur', width=150, font_size=12, alignment='AlignVCenter|AlignRight')
-        label_style = ui_widgets.UiQLabel('Type de ligne', width=150, font_size=12, alignment='AlignVCenter|AlignRight')
-
-        self.label_color = ui_widgets.UiQLabelColor(width=20, height=20)
-        self.label_line_ep = ui_widgets.UiQLineEditDouble('', height=20, width=170)
-        self.combox_line_types = ui_widgets.UiQComboBox(self.LineTypes, height=20, width=170)
-
-        layout = QtGui.QGridLayout(self)
-        layout.addWidget(label_color, 0, 0, 1, 1)
-        layout.addWidget(label_epaiseur, 1, 0, 1, 1)
-        layout.addWidget(label_style, 2, 0, 1, 1)
-        layout.addWidget(self.label_color, 0, 1, 1, 1)
-        layout.addWidget(self.label_line_ep, 1, 1, 1, 1)
-        layout.addWidget(self.combox_line_types, 2, 1, 1, 1)
-
-    def set_color(self, rgb):
-        if rgb:
-            self.label_color.setColor(rgb)
-
-    def set_width(self, ep):
-        self.label_line_ep.setText('{0:.3f}'.format(ep))
-
-    def set_line_type(self, line_type):
-        self.combox_line_types.setCurrentIndex(line_type - 1)
-
-    def get_color(self):
-        return self.label_color.getColor()
-
-    def get_width(self):
-        return float(self.label_line_ep.text())
-
-    def get_line_type(self):
-        return self.combox_line_types.currentIndex() + 1
+from profiling import tracer
 
 
 ## Dialog window where user can adjust chart vizualisation
@@ -75,16 +34,11 @@ class UiChartOptionsDialog(QtGui.QScrollArea):
 
         self.parent_widget = parent_widget
 
-        scroll_area = QtGui.QScrollArea()
-        scroll_area.setMinimumHeight(280)
-        scroll_area.setFixedWidth(400)
-
-        self.frame_data = QtGui.QFrame(scroll_area)
-        self.layout = QtGui.QGridLayout(self.frame_data)
-
         self.setWindowFlags(self.windowFlags() | QtCore.Qt.Window)
         self.setWindowFlags(self.windowFlags() ^ QtCore.Qt.WindowMinimizeButtonHint)
         self.setWindowTitle("Options du graph")
+        self.setMinimumHeight(380)
+        self.setFixedWidth(420)
 
         gb_limits = ui_widgets.UiQGroupBox("Limites", bold=True, height=100, width=360)
         gb_limits_layout = QtGui.QGridLayout(gb_limits)
@@ -108,21 +62,28 @@ class UiChartOptionsDialog(QtGui.QScrollArea):
         gb_limits_layout.addWidget(label_y_max, 1, 2, 1, 1)
         gb_limits_layout.addWidget(self.line_y_max, 1, 3, 1, 1)
 
-        self.layout.addWidget(gb_limits, 0, 0, 1, 1)
-        scroll_area.setWidget(self.frame_data)
+        button_fit_y = ui_widgets.UiQPushButton("Ajuster Y", width=80, height=20, font_size=12)
+        button_fit_y.clicked.connect(self.on_button_fit_y_clicked)
+        gb_limits_layout.addWidget(button_fit_y, 2, 3, 1, 1)
+
+        # one row per series, editors are only created for the edited cell
+        self.series_model = UiSeriesOptionsModel(self)
+        self.series_view = UiSeriesOptionsView(self.series_model)
 
         button_annuler = ui_widgets.UiQPushButton("Annuler", width=80, height=25, font_size=12)
         button_appliquer = ui_widgets.UiQPushButton("Appliquer", width=80, height=25, font_size=12)
 
         main_layout = QtGui.QGridLayout(self)
-        main_layout.addWidget(scroll_area, 0, 0, 1, 4)
-        main_layout.addWidget(button_appliquer, 1, 2, 1, 1)
-        main_layout.addWidget(button_annuler, 1, 3, 1, 1)
+        main_layout.addWidget(gb_limits, 0, 0, 1, 4)
+        main_layout.addWidget(self.series_view, 1, 0, 1, 4)
+        main_layout.addWidget(button_appliquer, 2, 2, 1, 1)
+        main_layout.addWidget(button_annuler, 2, 3, 1, 1)
 
         button_appliquer.clicked.connect(self.on_button_appliquer_clicked)
         button_annuler.clicked.connect(self.on_button_annuler_clicked)
 
-        self.line_opt_widgets = []
+        # the options are read from the chart when the dialog is shown
+        self._outdated = True
 
     @property
     def options_dict(self):
@@ -134,13 +95,7 @@ class UiChartOptionsDialog(QtGui.QScrollArea):
             options_dict['y_max'] = float(self.line_y_max.text())
         except ValueError:
             return {}
-        lines_options = []
-        for opt_widget in self.line_opt_widgets:
-            rgb = opt_widget.get_color()
-            width = opt_widget.get_width()
-            line_type = opt_widget.get_line_type()
-            lines_options.append([rgb, width, line_type])
-        options_dict['lines_options'] = lines_options
+        options_dict['lines_options'] = self.series_model.lines_options()
         return options_dict
 
     def on_button_appliquer_clicked(self):
@@ -149,36 +104,45 @@ class UiChartOptionsDialog(QtGui.QScrollArea):
         if options_dict:
             vtk_chart.apply_options(options_dict)
 
+    def on_button_fit_y_clicked(self):
+        # line_y_* hold the X limits and line_x_* the Y limits, see the labels
+        try:
+            x_range = (float(self.line_y_min.text()), float(self.line_y_max.text()))
+        except ValueError:
+            return
+        y_range = self.parent_widget.vtk_chart.visible_y_range(x_range)
+        if y_range is not None:
+            self.line_x_min.setText('{0:.3f}'.format(y_range[0]))
+            self.line_x_max.setText('{0:.3f}'.format(y_range[1]))
+
     def on_button_annuler_clicked(self):
         self.close()
         self.update()
 
     def update(self):
+        if not self.isVisible():
+            self._outdated = True
+            return
+        self._outdated = False
         vtk_chart = self.parent_widget.vtk_chart
         options_dict = vtk_chart.options_dict
         self.line_x_min.setText('{0:.3f}'.format(options_dict['x_min']))
         self.line_x_max.setText('{0:.3f}'.format(options_dict['x_max']))
         self.line_y_min.setText('{0:.3f}'.format(options_dict['y_min']))
         self.line_y_max.setText('{0:.3f}'.format(options_dict['y_max']))
+        self.series_model.set_lines_options(options_dict['lines_names'], options_dict['lines_options'])
 
-        for opt_widget in self.line_opt_widgets:
-            opt_widget.setParent(None)
-        self.line_opt_widgets = []
-
-        for ind, options in enumerate(options_dict['lines_options']):
-            opt_widget = UiPlotLineOptionsGroupBox(ind + 1)
-            opt_widget.set_color(options[0])
-            opt_widget.set_width(options[1])
-            opt_widget.set_line_type(options[2])
-            self.layout.addWidget(opt_widget, ind + 1, 0, 1, 1)
-            self.line_opt_widgets.append(opt_widget)
-        n_lines = len(options_dict['lines_options'])
-        self.frame_data.setFixedHeight(105 * (n_lines + 1))
+    def showEvent(self, event):
+        super(UiChartOptionsDialog, self).showEvent(event)
+        if self._outdated:
+            self.update()
 
 
 # Chart widget gui class
 class UiChartWidget(QtGui.QFrame):
 
+    trace_event = QtCore.pyqtSignal(object)
+
     OpenIcon = os.path.join(config.dir_pics, 'open.png')
     ChartIcon = os.path.join(config.dir_pics, 'chart.png')
     OptionsIcon = os.path.join(config.dir_pics, 'custom_view_options.png')
@@ -191,6 +155,8 @@ class UiChartWidget(QtGui.QFrame):
         self.logger = main_window.logger
 
         self.options_dialog = UiChartOptionsDialog(self)
+        self.data_table_dialog = UiDataTableDialog(self)
+        self.derived_series_dialog = UiDerivedSeriesDialog(self)
 
         self.setWindowFlags(self.windowFlags() | QtCore.Qt.Window)
         self.setWindowFlags(self.windowFlags() ^ QtCore.Qt.WindowMinimizeButtonHint)
@@ -208,12 +174,70 @@ class UiChartWidget(QtGui.QFrame):
         action_options = QtGui.QAction(QtGui.QIcon(self.OptionsIcon), 'Options du graph', self)
         action_options.triggered.connect(self.options_dialog.show)
 
+        action_table = QtGui.QAction('Tableau des valeurs', self)
+        action_table.triggered.connect(self.data_table_dialog.show)
+
+        action_derived = QtGui.QAction('Series derivees', self)
+        action_derived.triggered.connect(self.derived_series_dialog.show)
+
         action_export = QtGui.QAction(QtGui.QIcon(self.ExportIcon), 'Exporter les valeurs', self)
         action_export.triggered.connect(self.export_values)
 
+        self.action_cancel = QtGui.QAction('Annuler la lecture', self)
+        self.action_cancel.triggered.connect(self.cancel_loading)
+        self.action_cancel.setEnabled(False)
+
+        self.action_follow = QtGui.QAction('Suivre le fichier', self)
+        self.action_follow.setCheckable(True)
+        self.action_follow.setEnabled(False)
+        self.action_follow.toggled.connect(self.set_following)
+        self.loaded_file = None
+        self.follower = None
+
+        action_fit_y = QtGui.QAction('Ajuster Y au zoom', self)
+        action_fit_y.setCheckable(True)
+        action_fit_y.toggled.connect(self.set_fit_y)
+
+        action_scatter = QtGui.QAction('Nuage de points', self)
+        action_scatter.setCheckable(True)
+        action_scatter.toggled.connect(self.set_scatter_mode)
+
+        action_cursor = QtGui.QAction('Curseur', self)
+        action_cursor.setCheckable(True)
+        action_cursor.toggled.connect(self.set_cursor_enabled)
+
+        action_profiling = QtGui.QAction('Profiler', self)
+        action_profiling.setCheckable(True)
+        action_profiling.toggled.connect(self.set_profiling)
+
+        action_export_trace = QtGui.QAction('Exporter la trace', self)
+        action_export_trace.triggered.connect(self.export_trace)
+
+        # spans may end in worker threads, they are logged through a queued
+        # signal
+        self.trace_event.connect(self.on_trace_event)
+        tracer.add_sink(self.trace_event.emit)
+
+        self.progress_bar = QtGui.QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setFixedWidth(150)
+        self.progress_bar.hide()
+        self.load_thread = None
+
         options_toolbar.addAction(action_open)
         options_toolbar.addAction(action_options)
+        options_toolbar.addAction(action_table)
+        options_toolbar.addAction(action_derived)
         options_toolbar.addAction(action_export)
+        options_toolbar.addAction(self.action_follow)
+        options_toolbar.addAction(action_cursor)
+        options_toolbar.addAction(action_fit_y)
+        options_toolbar.addAction(action_scatter)
+        options_toolbar.addAction(action_profiling)
+        options_toolbar.addAction(action_export_trace)
+        options_toolbar.addSeparator()
+        options_toolbar.addAction(self.action_cancel)
+        options_toolbar.addWidget(self.progress_bar)
 
         chart_layout = QtGui.QGridLayout(self)
         chart_layout.setContentsMargins(0, 0, 0, 0)
@@ -223,52 +247,244 @@ class UiChartWidget(QtGui.QFrame):
 
         self.vtk_chart = VTKChartWidget(self)
         self.vtk_chart.add_callback(self.options_dialog.update)
+        self.vtk_chart.add_callback(self.data_table_dialog.refresh)
+        self.vtk_chart.add_data_callback(self.data_table_dialog.refresh)
+        self.vtk_chart.add_callback(self.derived_series_dialog.refresh)
 
         self.vtk_chart.interactor.Initialize()
         self.vtk_chart.interactor.Start()
 
+        action_profiling.setChecked(config.profiling)
+
+    OpenFilters = ['Donnees (*.csv *.txt *.dat *.vcol *.gz *.bz2 *.xz *.br *.sz)',
+                   'Csv File (*.csv)',
+                   'Texte (*.txt *.dat)',
+                   'Colonnes binaires (*.vcol)',
+                   'Csv compresse (*.gz *.bz2 *.xz *.br *.sz)',
+                   'Tous les fichiers (*)']
+
+    ExportFilters = ['Text File (*.txt)',
+                     'NumPy (*.npy)',
+                     'NumPy archive (*.npz)',
+                     'Binaire float64 (*.bin)']
+
     def export_values(self):
-        table = self.vtk_chart.get_values_as_table()
-        if not table:
+        names, columns = self.vtk_chart.get_columns()
+        if not columns or not len(columns[0]):
             return
-        filename = QtGui.QFileDialog.getSaveFileName(self, "Nom du fichier de text", '', "Text File (*.txt)")
+        filename = QtGui.QFileDialog.getSaveFileName(self, "Nom du fichier de text", '', ';;'.join(self.ExportFilters))
         if filename:
-            with open(filename, 'w') as f0:
-                titles = '\t'.join(table[0])
-                f0.write(titles + '\n')
-                for row in table[1:]:
-                    vals = [str(v) for v in row]
-                    f0.write('\t'.join(vals) + '\n')
+            filename = str(filename)
+            try:
+                table_export.export_columns(filename, names, columns)
+            except (IOError, OSError) as e:
+                self.logger.emit("Erreur en cours d'ecriture {}: ".format(filename), 'error')
+                self.logger.emit(str(e), 'error', hide_time=True)
+                return
             self.logger.emit('Fichier {0} a ete cree avec succes'.format(filename))
 
+    def set_profiling(self, enabled):
+        if enabled:
+            tracer.enable(trace_memory=True)
+        else:
+            tracer.disable()
+
+    def on_trace_event(self, event):
+        if event['duration'] < config.trace_log_threshold:
+            return
+        text = '{0}: {1:.1f} ms'.format(event['name'], 1000 * event['duration'])
+        if 'memory_delta' in event:
+            text += ', {0:+.1f} MB'.format(event['memory_delta'] / 2.0 ** 20)
+        self.logger.emit(text, hide_time=True)
+
+    def export_trace(self):
+        filters = 'Chrome trace (*.trace.json);;JSON (*.json)'
+        filename = QtGui.QFileDialog.getSaveFileName(self, "Nom du fichier de trace", '', filters)
+        if filename:
+            filename = str(filename)
+            tracer.export(filename)
+            self.logger.emit('Trace de {0:d} evenements ecrite dans {1}'.format(len(tracer.events), filename))
+
     def read_csv(self):
-        file_path = QtGui.QFileDialog.getOpenFileName(self, "Nom du fichier csv", '', "Csv File (*.csv)")
-        if not file_path:
+        file_paths = QtGui.QFileDialog.getOpenFileNames(self, "Noms des fichiers csv", '', ';;'.join(self.OpenFilters))
+        file_paths = [str(p) for p in file_paths]
+        if not file_paths:
             return
 
-        plot_name = os.path.basename(file_path)
-        x_vals = []
-        y_vals = []
-        try:
-            with open(file_path, 'r') as f:
-                for line in f:
-                    x, y = map(float, [s.strip() for s in line.split(',')[:2]])
-                    x_vals.append(x)
-                    y_vals.append(y)
-            x_array = vtk.vtkDoubleArray()
-            y_array = vtk.vtkDoubleArray()
-            x_array.SetNumberOfComponents(1)
-            y_array.SetNumberOfComponents(1)
-            x_array.SetName("x")
-            y_array.SetName("y")
-            for x_val, y_val in zip(x_vals, y_vals):
-                x_array.InsertNextValue(x_val)
-                y_array.InsertNextValue(y_val)
-            self.vtk_chart.set_xy_data(x_array, y_array, plot_name)
-        except Exception as e:
-            self.logger.emit('Erreur en cours de lecture {}: '.format(file_path), 'error')
-            self.logger.emit(str(e), 'error', hide_time=True)
+        self.cancel_loading()
+        self.action_follow.setChecked(False)
+        self.action_follow.setEnabled(False)
+        if len(file_paths) == 1:
+            self.load_thread = UiCsvLoadThread(file_paths[0], parent=self)
+            self.load_thread.loaded.connect(self.on_csv_loaded)
+            self.load_thread.failed.connect(self.on_csv_failed)
+            self.load_thread.cancelled.connect(self.on_csv_cancelled)
+            self.logger.emit('Lecture de {} ...'.format(file_paths[0]))
+        else:
+            self.load_thread = UiMultiCsvLoadThread(file_paths, parent=self)
+            self.load_thread.loaded.connect(self.on_files_loaded)
+            self.load_thread.file_failed.connect(self.on_file_failed)
+            self.load_thread.failed.connect(self.on_files_failed)
+            self.load_thread.cancelled.connect(self.on_files_cancelled)
+            self.logger.emit('Lecture de {0:d} fichiers ...'.format(len(file_paths)))
+        self.load_thread.progress.connect(self.on_loading_progress)
+        self.load_thread.finished.connect(self.on_loading_finished)
+
+        self.progress_bar.setValue(0)
+        self.progress_bar.show()
+        self.action_cancel.setEnabled(True)
+        self.load_thread.start()
+
+    def cancel_loading(self):
+        if self.load_thread is not None and self.load_thread.isRunning():
+            self.load_thread.cancel()
+
+    def is_current_loading(self):
+        return self.sender() is self.load_thread
+
+    def on_loading_progress(self, value):
+        if self.is_current_loading():
+            self.progress_bar.setValue(value)
+
+    def on_loading_finished(self):
+        if self.is_current_loading() and not self.load_thread.isRunning():
+            self.progress_bar.hide()
+            self.action_cancel.setEnabled(False)
+
+    def on_csv_loaded(self, parsed):
+        if not self.is_current_loading():
+            return
+        file_path = self.sender().file_path
+        self.report_bad_rows(parsed.bad_rows)
+        if not parsed.n_rows or len(parsed.columns) < 2:
+            self.logger.emit('Aucune valeur lue dans {}'.format(file_path), 'error')
+            return
+
+        n_columns = len(parsed.columns)
+        names = parsed.names or ['x'] + ['y{0:d}'.format(i) for i in range(1, n_columns)]
+        columns = parsed.columns
+        title = os.path.basename(file_path)
+        # reloading a file with the same columns keeps the plots, the storage
+        # policy was applied by the loading thread
+        self.vtk_chart.update_data(columns[0], columns[1:], title, parsed.pyramids, names, stored=True)
+        self.logger.emit('{0:d} points de {1:d} series lus dans {2}'.format(
+            parsed.n_rows, n_columns - 1, file_path), 'success')
+        self.report_memory()
+
+        # appended rows of a compressed or columnar file can not be parsed
+        # from an offset
+        csv_format = self.sender().csv_format
+        if csv_format is not None and compression.detect_compression(file_path) is None:
+            self.loaded_file = (file_path, parsed.n_bytes, csv_format, parsed.n_lines)
+            self.action_follow.setEnabled(True)
+        else:
+            self.loaded_file = None
+
+    def on_files_loaded(self, loaded):
+        if not self.is_current_loading():
+            return
+        datasets = []
+        n_points = 0
+        for file_path, parsed in loaded:
+            self.report_bad_rows(parsed.bad_rows, file_path=file_path)
+            if not parsed.n_rows or len(parsed.columns) < 2:
+                self.logger.emit('Aucune valeur lue dans {}'.format(file_path), 'error')
+                continue
+            n_columns = len(parsed.columns)
+            names = parsed.names or ['x'] + ['y{0:d}'.format(i) for i in range(1, n_columns)]
+            arrays = [data_bridge.as_vtk_column(column, name)
+                      for column, name in zip(parsed.columns, names)]
+            label = os.path.splitext(os.path.basename(file_path))[0]
+            datasets.append((label, arrays[0], arrays[1:], parsed.pyramids))
+            n_points += parsed.n_rows
+        if not datasets:
+            return
+        self.vtk_chart.set_overlay_data(datasets, '{0:d} fichiers'.format(len(datasets)))
+        self.logger.emit('{0:d} points lus dans {1:d} fichiers'.format(n_points, len(datasets)), 'success')
+        # overlaid files are not followed
+        self.loaded_file = None
 
+    def on_file_failed(self, file_path, message):
+        if not self.is_current_loading():
+            return
+        self.logger.emit('Erreur en cours de lecture {}: '.format(file_path), 'error')
+        self.logger.emit(message, 'error', hide_time=True)
+
+    def on_files_failed(self, message):
+        if not self.is_current_loading():
+            return
+        self.logger.emit('Erreur en cours de lecture des fichiers: ', 'error')
+        self.logger.emit(message, 'error', hide_time=True)
+
+    def on_files_cancelled(self):
+        if not self.is_current_loading():
+            return
+        self.logger.emit('Lecture des fichiers annulee', 'warning')
+
+    def set_scatter_mode(self, enabled):
+        self.vtk_chart.set_scatter_mode(enabled)
+
+    def set_fit_y(self, enabled):
+        self.vtk_chart.set_fit_y(enabled)
+
+    def set_cursor_enabled(self, enabled):
+        self.vtk_chart.set_cursor_enabled(enabled)
+
+    def set_following(self, enabled):
+        if self.follower is not None:
+            self.follower.stop()
+            self.follower = None
+        if enabled and self.loaded_file is not None:
+            file_path, offset, csv_format, n_lines = self.loaded_file
+            # bad rows of the appended lines are numbered from the start of
+            # the file
+            self.follower = UiFileFollower(file_path, offset, csv_format.n_columns,
+                                           csv_format.delimiter, n_lines, parent=self)
+            self.follower.rows_appended.connect(self.on_rows_appended)
+            self.follower.truncated.connect(self.on_followed_file_truncated)
+            self.logger.emit('Suivi de {}'.format(file_path))
+
+    def on_rows_appended(self, parsed):
+        self.report_bad_rows(parsed.bad_rows)
+        if parsed.n_rows:
+            self.vtk_chart.append_rows(parsed.columns[0], parsed.columns[1:])
+
+    def on_followed_file_truncated(self):
+        self.logger.emit('Le fichier {} a ete tronque, suivi arrete'.format(self.loaded_file[0]), 'warning')
+        self.action_follow.setChecked(False)
+
+    def on_csv_failed(self, message):
+        # a replaced loading does not report on the current one
+        if not self.is_current_loading():
+            return
+        file_path = self.sender().file_path
+        self.logger.emit('Erreur en cours de lecture {}: '.format(file_path), 'error')
+        self.logger.emit(message, 'error', hide_time=True)
+
+    def on_csv_cancelled(self):
+        if not self.is_current_loading():
+            return
+        self.logger.emit('Lecture de {} annulee'.format(self.sender().file_path), 'warning')
+
+    def report_memory(self, max_reported=10):
+        report = self.vtk_chart.memory_report()
+        columns = ', '.join('{0} ({1}) {2:.1f} Mo'.format(name, storage, n_bytes / 2.0 ** 20)
+                            for name, storage, n_bytes in report[:max_reported])
+        if len(report) > max_reported:
+            columns += ', ...'
+        total = sum(n_bytes for _, _, n_bytes in report)
+        self.logger.emit('Memoire des colonnes: {0:.1f} Mo, {1}'.format(total / 2.0 ** 20, columns))
+
+    def report_bad_rows(self, bad_rows, max_reported=10, file_path=None):
+        if not len(bad_rows):
+            return
+        lines = ', '.join(str(i + 1) for i in bad_rows[:max_reported])
+        if len(bad_rows) > max_reported:
+            lines += ', ...'
+        message = '{0:d} lignes ignorees: {1}'.format(len(bad_rows), lines)
+        if file_path is not None:
+            message = '{0}: {1}'.format(file_path, message)
+        self.logger.emit(message, 'warning')
 
     def init_position(self):
         self.resize(780, 250)
@@ -1,4 +1,5 @@
 import os
+import multiprocessing
 
 
 ## Application configuration class
@@ -10,6 +11,38 @@ class ConfigObject(object):
         self.dir_tests = os.path.join(self.dir_outil, 'tests')
         self.dir_pics = os.path.join(self.dir_outil, 'pics')
         self.dir_bin = os.path.join(self.dir_outil, 'bin')
+        # cache of parsed csv files and its size limit in bytes
+        self.use_parse_cache = True
+        self.dir_cache = os.path.join(self.dir_outil, 'cache')
+        self.cache_max_bytes = 10 * 2 ** 30
+        # number of processes used to parse csv files
+        self.n_workers = multiprocessing.cpu_count()
+        # size in bytes of the file ranges parsed by each process
+        self.csv_chunk_size = 64 * 2 ** 20
+        # period in ms of the polling of followed files
+        self.follow_poll_interval = 500
+        # maximal number of frames per second drawn by the charts
+        self.max_fps = 30
+        # storage of the chart columns: float32 when the relative error of
+        # the conversion is below the tolerance, evenly spaced X columns
+        # stored as start and step
+        self.float32_storage = False
+        self.float32_tolerance = 1e-6
+        self.implicit_uniform_x = True
+        self.uniform_x_tolerance = 1e-6
+        # scatter mode: markers are drawn while the visible window holds at
+        # most scatter_marker_points points, a density image otherwise. The
+        # points are binned by chunks of density_chunk_size points, for
+        # about density_step_seconds per iteration of the event loop
+        self.scatter_marker_points = 100000
+        self.density_chunk_size = 2 ** 22
+        self.density_step_seconds = 0.03
+        # size limit in bytes of the memoized derived series
+        self.derived_cache_bytes = 512 * 2 ** 20
+        # instrumentation of the hot paths, spans longer than the threshold
+        # in seconds are written to the logger
+        self.profiling = False
+        self.trace_log_threshold = 0.01
 
 
 config = ConfigObject()
@@ -0,0 +1,150 @@
+'''
+Module with the viewer of the values of the table of a chart. The model
+reads the cells on demand from the numpy views of the vtk columns, nothing
+is copied, and rows are made known to the view by batches as it is
+scrolled, so opening the viewer costs the same for any number of rows.
+'''
+
+
+from PyQt4 import QtGui, QtCore
+
+
+default_fetch_rows = 10000
+
+cell_format = '{0:.15g}'
+
+
+## Read only table model of the columns of a chart, rows are fetched by
+# batches of fetch_rows rows
+class UiChartTableModel(QtCore.QAbstractTableModel):
+
+    def __init__(self, fetch_rows=default_fetch_rows, parent=None):
+        super(UiChartTableModel, self).__init__(parent)
+        self.fetch_rows = fetch_rows
+        self.names = []
+        self.columns = []
+        self.n_rows = 0
+        self.n_fetched = 0
+
+    def set_columns(self, names, columns):
+        self.beginResetModel()
+        self.names = names
+        self.columns = columns
+        self.n_rows = len(columns[0]) if columns else 0
+        self.n_fetched = min(self.n_rows, self.fetch_rows)
+        self.endResetModel()
+
+    def update_columns(self, names, columns):
+        '''
+        Updates the values of the same columns without resetting the view,
+        which keeps its scroll position, e.g. after rows were appended.
+        Other columns reset the model.
+        '''
+        n_rows = len(columns[0]) if columns else 0
+        if names != self.names or len(columns) != len(self.columns) or n_rows < self.n_fetched:
+            self.set_columns(names, columns)
+            return
+        self.columns = columns
+        self.n_rows = n_rows
+        if self.n_fetched:
+            self.dataChanged.emit(self.index(0, 0), self.index(self.n_fetched - 1, len(columns) - 1))
+        if self.n_fetched < min(n_rows, self.fetch_rows):
+            self.fetch_to(min(n_rows, self.fetch_rows) - 1)
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else self.n_fetched
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and self.n_fetched < self.n_rows
+
+    def fetchMore(self, parent):
+        if parent.isValid():
+            return
+        n_fetched = min(self.n_fetched + self.fetch_rows, self.n_rows)
+        self.beginInsertRows(QtCore.QModelIndex(), self.n_fetched, n_fetched - 1)
+        self.n_fetched = n_fetched
+        self.endInsertRows()
+
+    def fetch_to(self, row):
+        '''
+        Makes the rows up to row known to the view, e.g. before jumping to
+        the row.
+        '''
+        row = min(row, self.n_rows - 1)
+        if row >= self.n_fetched:
+            self.beginInsertRows(QtCore.QModelIndex(), self.n_fetched, row)
+            self.n_fetched = row + 1
+            self.endInsertRows()
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == QtCore.Qt.DisplayRole:
+            return cell_format.format(float(self.columns[index.column()][index.row()]))
+        if role == QtCore.Qt.TextAlignmentRole:
+            return int(QtCore.Qt.AlignRight | QtCore.Qt.AlignVCenter)
+        return None
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if role != QtCore.Qt.DisplayRole:
+            return None
+        if orientation == QtCore.Qt.Horizontal:
+            return self.names[section] or ''
+        return str(section + 1)
+
+
+## Window showing the values of the table of a chart
+class UiDataTableDialog(QtGui.QWidget):
+
+    def __init__(self, parent_widget):
+        super(UiDataTableDialog, self).__init__(parent=parent_widget)
+
+        self.parent_widget = parent_widget
+
+        self.setWindowFlags(self.windowFlags() | QtCore.Qt.Window)
+        self.setWindowTitle('Valeurs du graph')
+        self.resize(480, 600)
+
+        self.model = UiChartTableModel(parent=self)
+        self.view = QtGui.QTableView()
+        self.view.setModel(self.model)
+        # fixed row heights, the view never measures the rows
+        self.view.verticalHeader().setResizeMode(QtGui.QHeaderView.Fixed)
+        self.view.verticalHeader().setDefaultSectionSize(20)
+        self.view.horizontalHeader().setResizeMode(QtGui.QHeaderView.Interactive)
+        self.view.horizontalHeader().setDefaultSectionSize(140)
+        self.view.setWordWrap(False)
+
+        self.label_rows = QtGui.QLabel()
+        self.line_row = QtGui.QSpinBox()
+        self.line_row.setMinimum(1)
+        self.line_row.setPrefix('Ligne ')
+        self.line_row.editingFinished.connect(self.go_to_row)
+
+        layout = QtGui.QGridLayout(self)
+        layout.addWidget(self.label_rows, 0, 0, 1, 1)
+        layout.addWidget(self.line_row, 0, 1, 1, 1)
+        layout.addWidget(self.view, 1, 0, 1, 2)
+
+    def refresh(self):
+        # a hidden window reads the columns when it is shown
+        if not self.isVisible():
+            return
+        names, columns = self.parent_widget.vtk_chart.get_columns()
+        self.model.update_columns(names, columns)
+        self.label_rows.setText('{0:d} lignes'.format(self.model.n_rows))
+        self.line_row.setMaximum(max(self.model.n_rows, 1))
+
+    def go_to_row(self):
+        if not self.model.n_rows:
+            return
+        row = self.line_row.value() - 1
+        self.model.fetch_to(row)
+        self.view.scrollTo(self.model.index(row, 0), QtGui.QAbstractItemView.PositionAtTop)
+
+    def showEvent(self, event):
+        super(UiDataTableDialog, self).showEvent(event)
+        self.refresh()
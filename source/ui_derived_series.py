@@ -0,0 +1,98 @@
+'''
+Module with the window adding series derived from the series of a chart
+(moving average, derivative, integral, spectrum) and listing them.
+'''
+
+
+from PyQt4 import QtGui, QtCore
+
+import derived
+
+
+## Window of the derived series of a chart
+class UiDerivedSeriesDialog(QtGui.QWidget):
+
+    def __init__(self, parent_widget):
+        super(UiDerivedSeriesDialog, self).__init__(parent=parent_widget)
+
+        self.parent_widget = parent_widget
+
+        self.setWindowFlags(self.windowFlags() | QtCore.Qt.Window)
+        self.setWindowTitle('Series derivees')
+        self.resize(420, 360)
+
+        self.combo_source = QtGui.QComboBox()
+        self.combo_operation = QtGui.QComboBox()
+        for operation, (label, _, _) in derived.operations.items():
+            self.combo_operation.addItem(label, operation)
+        self.combo_operation.currentIndexChanged.connect(self.on_operation_changed)
+
+        self.spin_window = QtGui.QSpinBox()
+        self.spin_window.setRange(1, 10 ** 7)
+        self.spin_window.setValue(10)
+        self.spin_window.setPrefix('Fenetre ')
+        self.spin_window.setSuffix(' points')
+
+        button_add = QtGui.QPushButton('Ajouter')
+        button_add.clicked.connect(self.on_button_add_clicked)
+
+        self.list_derived = QtGui.QListWidget()
+        button_remove = QtGui.QPushButton('Supprimer')
+        button_remove.clicked.connect(self.on_button_remove_clicked)
+
+        layout = QtGui.QGridLayout(self)
+        layout.addWidget(QtGui.QLabel('Serie'), 0, 0, 1, 1)
+        layout.addWidget(self.combo_source, 0, 1, 1, 1)
+        layout.addWidget(QtGui.QLabel('Operation'), 1, 0, 1, 1)
+        layout.addWidget(self.combo_operation, 1, 1, 1, 1)
+        layout.addWidget(self.spin_window, 2, 1, 1, 1)
+        layout.addWidget(button_add, 3, 1, 1, 1)
+        layout.addWidget(self.list_derived, 4, 0, 1, 2)
+        layout.addWidget(button_remove, 5, 1, 1, 1)
+
+        self.on_operation_changed()
+
+    @property
+    def operation(self):
+        return list(derived.operations.keys())[self.combo_operation.currentIndex()]
+
+    def on_operation_changed(self, *args):
+        self.spin_window.setEnabled('window' in derived.operations[self.operation][2])
+
+    def on_button_add_clicked(self):
+        source_name = str(self.combo_source.currentText())
+        if not source_name:
+            return
+        params = {}
+        if 'window' in derived.operations[self.operation][2]:
+            params['window'] = self.spin_window.value()
+        vtk_chart = self.parent_widget.vtk_chart
+        vtk_chart.add_derived_series(source_name, self.operation, **params)
+        for name, message in vtk_chart.derived_errors:
+            self.parent_widget.logger.emit('Erreur de calcul de {0}: '.format(name), 'error')
+            self.parent_widget.logger.emit(message, 'error', hide_time=True)
+
+    def on_button_remove_clicked(self):
+        row = self.list_derived.currentRow()
+        if row >= 0:
+            self.parent_widget.vtk_chart.remove_derived_series(row)
+
+    def refresh(self):
+        # a hidden window reads the series when it is shown
+        if not self.isVisible():
+            return
+        vtk_chart = self.parent_widget.vtk_chart
+        source_name = self.combo_source.currentText()
+        self.combo_source.clear()
+        self.combo_source.addItems(vtk_chart.source_names)
+        index = self.combo_source.findText(source_name)
+        if index >= 0:
+            self.combo_source.setCurrentIndex(index)
+        self.list_derived.clear()
+        failed = set(name for name, _ in vtk_chart.derived_errors)
+        self.list_derived.addItems([name + ' (erreur)' if name in failed else name
+                                    for name in vtk_chart.derived_names])
+
+    def showEvent(self, event):
+        super(UiDerivedSeriesDialog, self).showEvent(event)
+        self.refresh()
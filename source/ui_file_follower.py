@@ -0,0 +1,95 @@
+'''
+Module with the follow mode of growing csv files. Only the bytes appended
+to the file since the last read are parsed, the new rows are sent to the
+chart to be appended to its table.
+'''
+
+
+import os
+
+from PyQt4 import QtCore
+
+from ui_config import config
+
+import csv_loader
+
+
+## Incremental parser of a file which grows by appending lines. It keeps
+# the offset of the end of the read bytes and the last incomplete line.
+# offset is the end of the complete lines already parsed, n_lines their
+# number, so that bad rows are numbered from the start of the file
+class TailParser(object):
+
+    def __init__(self, file_path, offset=0, n_columns=2, delimiter=b',', n_lines=0):
+        super(TailParser, self).__init__()
+        self.file_path = file_path
+        self.n_columns = n_columns
+        self.delimiter = delimiter
+        self.offset = offset
+        self.partial = b''
+        self.n_lines = n_lines
+
+    @property
+    def truncated(self):
+        return os.path.getsize(self.file_path) < self.offset
+
+    def read_new_rows(self):
+        '''
+        Parses the complete lines appended since the previous call. Returns
+        a csv_loader.ParsedColumns object, None when nothing was appended.
+        '''
+        with open(self.file_path, 'rb') as f:
+            f.seek(self.offset)
+            new_bytes = f.read()
+        if not new_bytes:
+            return None
+        self.offset += len(new_bytes)
+
+        data = self.partial + new_bytes
+        last_newline = data.rfind(b'\n')
+        if last_newline < 0:
+            self.partial = data
+            return None
+        self.partial = data[last_newline + 1:]
+        complete = data[:last_newline + 1]
+
+        parsed = csv_loader.parse_buffer(complete, self.n_columns, self.delimiter)
+        parsed.bad_rows = parsed.bad_rows + self.n_lines
+        self.n_lines += parsed.n_lines
+        return parsed
+
+
+## Watches a file and emits the rows appended to it. The file system
+# watcher of qt is used when available, the file is also polled
+# periodically since watchers are not reliable on every file system
+class UiFileFollower(QtCore.QObject):
+
+    rows_appended = QtCore.pyqtSignal(object)
+    truncated = QtCore.pyqtSignal()
+
+    def __init__(self, file_path, offset, n_columns=2, delimiter=b',', n_lines=0, parent=None):
+        super(UiFileFollower, self).__init__(parent)
+        self.file_path = file_path
+        self.parser = TailParser(file_path, offset, n_columns, delimiter, n_lines)
+
+        self.watcher = QtCore.QFileSystemWatcher(self)
+        self.watcher.addPath(file_path)
+        self.watcher.fileChanged.connect(self.read_new_rows)
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.setInterval(config.follow_poll_interval)
+        self.timer.timeout.connect(self.read_new_rows)
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+        self.watcher.removePath(self.file_path)
+
+    def read_new_rows(self, *args):
+        if not os.path.isfile(self.file_path) or self.parser.truncated:
+            self.stop()
+            self.truncated.emit()
+            return
+        parsed = self.parser.read_new_rows()
+        if parsed is not None and (parsed.n_rows or len(parsed.bad_rows)):
+            self.rows_appended.emit(parsed)
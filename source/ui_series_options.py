@@ -0,0 +1,192 @@
+'''
+Module with the model/view editor of the line options of the series of a
+chart. Rows are painted by the view only when visible and editors are
+created only for the edited cell, so the cost of the editor does not depend
+on the number of series.
+'''
+
+
+from PyQt4 import QtGui, QtCore
+
+
+LineTypes = ['SOLID_LINE',
+             'DASH_LINE',
+             'DOT_LINE',
+             'DASH_DOT_LINE',
+             'DASH_DOT_DOT_LINE',
+             'DENSE_DOT_LINE']
+
+
+def _py_value(value):
+    # QVariant with the version 1 of the PyQt4 api, python value otherwise
+    return value.toPyObject() if hasattr(value, 'toPyObject') else value
+
+
+## Table model of the options (color, width, line type) of the series,
+# one row per series
+class UiSeriesOptionsModel(QtCore.QAbstractTableModel):
+
+    NAME, COLOR, WIDTH, LINE_TYPE = range(4)
+
+    Headers = ['Serie', 'Couleur', 'Epaisseur', 'Type de ligne']
+
+    def __init__(self, parent=None):
+        super(UiSeriesOptionsModel, self).__init__(parent)
+        # rows of [name, rgb, width, line type]
+        self.rows = []
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.Headers)
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if role != QtCore.Qt.DisplayRole:
+            return None
+        if orientation == QtCore.Qt.Horizontal:
+            return self.Headers[section]
+        return str(section + 1)
+
+    def flags(self, index):
+        flags = QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsSelectable
+        if index.column() != self.NAME:
+            flags |= QtCore.Qt.ItemIsEditable
+        return flags
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        name, rgb, width, line_type = self.rows[index.row()]
+        column = index.column()
+        if role == QtCore.Qt.DisplayRole:
+            if column == self.NAME:
+                return name
+            if column == self.WIDTH:
+                return '{0:.3f}'.format(width)
+            if column == self.LINE_TYPE:
+                return LineTypes[(line_type - 1) % len(LineTypes)]
+        elif role == QtCore.Qt.EditRole:
+            return self.rows[index.row()][column]
+        elif role == QtCore.Qt.BackgroundRole and column == self.COLOR:
+            color = QtGui.QColor()
+            color.setRgbF(*rgb)
+            return QtGui.QBrush(color)
+        return None
+
+    def setData(self, index, value, role=QtCore.Qt.EditRole):
+        if not index.isValid() or role != QtCore.Qt.EditRole or index.column() == self.NAME:
+            return False
+        value = _py_value(value)
+        if index.column() == self.COLOR:
+            value = tuple(value)
+        elif index.column() == self.WIDTH:
+            value = float(value)
+        else:
+            value = int(value)
+        self.rows[index.row()][index.column()] = value
+        self.dataChanged.emit(index, index)
+        return True
+
+    def set_lines_options(self, names, lines_options):
+        '''
+        Updates the rows in place: rows are only inserted or removed when
+        the number of series changes, and only the changed rows are
+        signaled to the view.
+        '''
+        new_rows = [[name, tuple(rgb), width, line_type]
+                    for name, (rgb, width, line_type) in zip(names, lines_options)]
+        n_old = len(self.rows)
+        n_new = len(new_rows)
+        if n_new < n_old:
+            self.beginRemoveRows(QtCore.QModelIndex(), n_new, n_old - 1)
+            del self.rows[n_new:]
+            self.endRemoveRows()
+
+        changed = [i for i in range(min(n_old, n_new)) if self.rows[i] != new_rows[i]]
+        for i in changed:
+            self.rows[i] = new_rows[i]
+        if changed:
+            self.dataChanged.emit(self.index(changed[0], 0),
+                                  self.index(changed[-1], self.columnCount() - 1))
+
+        if n_new > n_old:
+            self.beginInsertRows(QtCore.QModelIndex(), n_old, n_new - 1)
+            self.rows.extend(new_rows[n_old:])
+            self.endInsertRows()
+
+    def lines_options(self):
+        return [[rgb, width, line_type] for _, rgb, width, line_type in self.rows]
+
+
+## Delegate of the color cells, the color dialog is opened by a double
+# click instead of an inline editor
+class UiColorDelegate(QtGui.QStyledItemDelegate):
+
+    def createEditor(self, parent, option, index):
+        return None
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() != QtCore.QEvent.MouseButtonDblClick:
+            return False
+        initial = QtGui.QColor()
+        initial.setRgbF(*_py_value(index.data(QtCore.Qt.EditRole)))
+        color = QtGui.QColorDialog.getColor(initial, self.parent())
+        if color.isValid():
+            model.setData(index, (color.redF(), color.greenF(), color.blueF()))
+        return True
+
+
+## Delegate of the width cells, edited with a spin box
+class UiWidthDelegate(QtGui.QStyledItemDelegate):
+
+    def createEditor(self, parent, option, index):
+        editor = QtGui.QDoubleSpinBox(parent)
+        editor.setDecimals(3)
+        editor.setRange(0.0, 100.0)
+        editor.setSingleStep(0.5)
+        return editor
+
+    def setEditorData(self, editor, index):
+        editor.setValue(float(_py_value(index.data(QtCore.Qt.EditRole))))
+
+    def setModelData(self, editor, model, index):
+        editor.interpretText()
+        model.setData(index, editor.value())
+
+
+## Delegate of the line type cells, edited with a combo box
+class UiLineTypeDelegate(QtGui.QStyledItemDelegate):
+
+    def createEditor(self, parent, option, index):
+        editor = QtGui.QComboBox(parent)
+        editor.addItems(LineTypes)
+        return editor
+
+    def setEditorData(self, editor, index):
+        editor.setCurrentIndex(int(_py_value(index.data(QtCore.Qt.EditRole))) - 1)
+
+    def setModelData(self, editor, model, index):
+        model.setData(index, editor.currentIndex() + 1)
+
+
+## View of the series options, rows have a uniform height
+class UiSeriesOptionsView(QtGui.QTableView):
+
+    def __init__(self, model, parent=None):
+        super(UiSeriesOptionsView, self).__init__(parent)
+        self.setModel(model)
+        self._delegates = [UiColorDelegate(self), UiWidthDelegate(self), UiLineTypeDelegate(self)]
+        self.setItemDelegateForColumn(model.COLOR, self._delegates[0])
+        self.setItemDelegateForColumn(model.WIDTH, self._delegates[1])
+        self.setItemDelegateForColumn(model.LINE_TYPE, self._delegates[2])
+
+        self.setEditTriggers(QtGui.QAbstractItemView.DoubleClicked |
+                             QtGui.QAbstractItemView.SelectedClicked)
+        self.setSelectionMode(QtGui.QAbstractItemView.SingleSelection)
+        self.verticalHeader().setResizeMode(QtGui.QHeaderView.Fixed)
+        self.verticalHeader().setDefaultSectionSize(22)
+        self.horizontalHeader().setStretchLastSection(True)
+        self.setColumnWidth(model.NAME, 120)
+        self.setColumnWidth(model.COLOR, 60)
+        self.setColumnWidth(model.WIDTH, 70)
@@ -464,7 +464,7 @@ class UiQCheckBox(QtGui.QCheckBox):
 
 class UiLoggerWidget(QtGui.QTextEdit):
 
-    colors = {'error': '#ff0000', 'success': '#006600', 'info': '#000000'}
+    colors = {'error': '#ff0000', 'warning': '#cc6600', 'success': '#006600', 'info': '#000000'}
 
     def __init__(self, font_size=12, parent=None):
         super(UiLoggerWidget, self).__init__(parent)
@@ -0,0 +1,210 @@
+'''
+Module with the qt threads used to run long operations out of the gui
+thread. Results are sent back to the gui thread through qt signals.
+'''
+
+
+from PyQt4 import QtCore
+
+from ui_config import config
+
+import csv_loader
+import pyramid
+import columnar_format
+
+from parse_cache import ParseCache
+from storage import StoragePolicy, UniformColumn
+
+from profiling import tracer
+
+
+def store_columns(parsed, storage_policy):
+    '''
+    Applies the storage policy to the columns of parsed, out of the gui
+    thread. The pyramids are pointed to the stored columns so that the
+    parsed ones are released.
+    '''
+    parsed.columns = storage_policy.store_columns(parsed.columns)
+    for column_pyramid, values in zip(parsed.pyramids, parsed.columns):
+        if not isinstance(values, UniformColumn):
+            column_pyramid.values = values
+
+
+## Thread that parses a csv file by byte ranges, reports the progress
+# of the parsing and can be cancelled between two ranges
+class UiCsvLoadThread(QtCore.QThread):
+
+    progress = QtCore.pyqtSignal(int)
+    loaded = QtCore.pyqtSignal(object)
+    failed = QtCore.pyqtSignal(str)
+    cancelled = QtCore.pyqtSignal()
+
+    def __init__(self, file_path, parent=None):
+        super(UiCsvLoadThread, self).__init__(parent)
+        self.file_path = file_path
+        # csv_loader.CsvFormat of the file, sniffed when loading, None for
+        # columnar files
+        self.csv_format = None
+        self._cancel_requested = False
+
+    def cancel(self):
+        self._cancel_requested = True
+
+    def run(self):
+        with tracer.span('load_csv', file_path=self.file_path):
+            self.load()
+
+    def load(self):
+        cache = None
+        if config.use_parse_cache:
+            cache = ParseCache(config.dir_cache, config.cache_max_bytes)
+        try:
+            parsed = None
+            if columnar_format.is_columnar(self.file_path):
+                cache = None
+                with tracer.span('open_columnar'):
+                    parsed = columnar_format.load_columnar(self.file_path)
+            else:
+                with tracer.span('sniff_csv'):
+                    self.csv_format = csv_loader.sniff_csv(self.file_path)
+            if parsed is None and cache is not None:
+                with tracer.span('parse_cache_load'):
+                    parsed = cache.load(self.file_path, self.csv_format.n_columns,
+                                        self.csv_format.delimiter)
+            if parsed is None:
+                parsed = self.parse()
+                if parsed is None:
+                    return
+                if cache is not None:
+                    with tracer.span('parse_cache_store'):
+                        try:
+                            cache.store(self.file_path, parsed, self.csv_format.n_columns,
+                                        self.csv_format.delimiter)
+                        except (IOError, OSError):
+                            pass
+            self.progress.emit(100)
+            with tracer.span('build_pyramids'):
+                parsed.pyramids = pyramid.load_or_build_pyramids(self.file_path, parsed.columns)
+            with tracer.span('store_columns'):
+                store_columns(parsed, StoragePolicy.from_config(config))
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.loaded.emit(parsed)
+
+    def parse(self):
+        '''
+        Parses all the columns of the file by byte ranges. An unterminated
+        last line is left to the follow mode, which parses it once it is
+        complete. Returns None when cancelled.
+        '''
+        csv_format = self.csv_format
+        parts = []
+        parsed_bytes = 0
+        ranges = csv_loader.iter_parse_csv(self.file_path, csv_format.n_columns,
+                                           csv_format.delimiter,
+                                           n_workers=config.n_workers,
+                                           chunk_size=config.csv_chunk_size,
+                                           complete_lines=True)
+        try:
+            for part, end, file_size in ranges:
+                if self._cancel_requested:
+                    self.cancelled.emit()
+                    return None
+                parts.append(part)
+                parsed_bytes = end
+                self.progress.emit(int(100 * end / max(file_size, 1)))
+        finally:
+            ranges.close()
+        if len(parts) == 1:
+            parsed = parts[0]
+        else:
+            parsed = csv_loader.concatenate_parsed(parts)
+        parsed.n_bytes = parsed_bytes
+        parsed.names = csv_format.names
+        return csv_loader.drop_header_rows(parsed, csv_format.n_header_lines)
+
+
+## Thread that loads several files at once, the files missing from the
+# parse cache are parsed concurrently, one file per process. It can be
+# cancelled between two files
+class UiMultiCsvLoadThread(QtCore.QThread):
+
+    progress = QtCore.pyqtSignal(int)
+    # list of (file path, csv_loader.ParsedColumns) in the selection order
+    loaded = QtCore.pyqtSignal(object)
+    file_failed = QtCore.pyqtSignal(str, str)
+    failed = QtCore.pyqtSignal(str)
+    cancelled = QtCore.pyqtSignal()
+
+    def __init__(self, file_paths, parent=None):
+        super(UiMultiCsvLoadThread, self).__init__(parent)
+        self.file_paths = file_paths
+        self._cancel_requested = False
+
+    def cancel(self):
+        self._cancel_requested = True
+
+    def run(self):
+        with tracer.span('load_files', n_files=len(self.file_paths)):
+            self.load()
+
+    def load(self):
+        cache = None
+        if config.use_parse_cache:
+            cache = ParseCache(config.dir_cache, config.cache_max_bytes)
+        n_files = len(self.file_paths)
+        results = [None] * n_files
+        try:
+            # columnar and cached files are memory mapped, not parsed
+            to_parse = []
+            for i, file_path in enumerate(self.file_paths):
+                if columnar_format.is_columnar(file_path):
+                    results[i] = columnar_format.load_columnar(file_path)
+                    continue
+                if cache is not None:
+                    csv_format = csv_loader.sniff_csv(file_path)
+                    results[i] = cache.load(file_path, csv_format.n_columns, csv_format.delimiter)
+                if results[i] is None:
+                    to_parse.append(i)
+            n_done = n_files - len(to_parse)
+            self.progress.emit(int(100 * n_done / n_files))
+
+            paths = [self.file_paths[i] for i in to_parse]
+            loads = csv_loader.iter_load_files(paths, config.n_workers)
+            try:
+                for index, result, message in loads:
+                    if self._cancel_requested:
+                        self.cancelled.emit()
+                        return
+                    file_path = paths[index]
+                    n_done += 1
+                    self.progress.emit(int(100 * n_done / n_files))
+                    if result is None:
+                        self.file_failed.emit(file_path, message)
+                        continue
+                    csv_format, parsed = result
+                    results[to_parse[index]] = parsed
+                    if cache is not None:
+                        try:
+                            cache.store(file_path, parsed, csv_format.n_columns, csv_format.delimiter)
+                        except (IOError, OSError):
+                            pass
+            finally:
+                loads.close()
+
+            # overlaid tables keep their X columns as arrays
+            storage_policy = StoragePolicy.from_config(config, implicit_x=False)
+            loaded = []
+            for file_path, parsed in zip(self.file_paths, results):
+                if parsed is None:
+                    continue
+                with tracer.span('build_pyramids'):
+                    parsed.pyramids = pyramid.load_or_build_pyramids(file_path, parsed.columns)
+                with tracer.span('store_columns'):
+                    store_columns(parsed, storage_policy)
+                loaded.append((file_path, parsed))
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.loaded.emit(loaded)
@@ -4,10 +4,29 @@ attributes. This class is used for vizuaisation and customizing of 2D plots
 '''
 
 
+import time
+
 import vtk
+import numpy as np
+
+from PyQt4 import QtCore
 
 from vtk.qt4.QVTKRenderWindowInteractor import QVTKRenderWindowInteractor
 
+import data_bridge
+import derived
+
+from cursor import SeriesCursor
+from density import DensityBinning
+from decimation import DecimatedSeries, is_sorted
+from storage import StoragePolicy, UniformColumn, memory_report
+from stream_buffer import ColumnBuffer
+from render_scheduler import RenderScheduler
+
+from ui_config import config
+
+from profiling import tracer
+
 
 default_line_colors = [(1, 0, 0),
                        (0, 1, 0),
@@ -35,6 +54,17 @@ default_line_width = [1.0,
                       2.0,
                       2.0]
 
+# minimal number of horizontal buckets of the level of detail decimation,
+# the width of the render window in pixels is used when it is larger
+default_lod_buckets = 1000
+
+# delay in seconds after a mouse button or wheel event during which a change
+# of the range of the axes is taken as a zoom or pan of the user
+user_input_delay = 0.5
+
+# size of the render window of charts created without a qt frame
+offscreen_size = (1600, 600)
+
 default_line_types = [1,
                       1,
                       1,
@@ -49,11 +79,21 @@ default_line_types = [1,
                       2]
 
 
+def _values_and_name(column, default_name=None):
+    '''
+    Returns the values, as a numpy array or a storage.UniformColumn, and the
+    name of the column given as a vtk array or as values.
+    '''
+    if isinstance(column, (np.ndarray, UniformColumn)):
+        return column, default_name
+    return data_bridge.to_numpy(column), column.GetName()
+
+
 ## Wrapper class on vtkChartXY. Its used for vizualisation
 # and customizing of 2D plots
 class VTKChartWidget(object):
 
-    def __init__(self, chart_frame):
+    def __init__(self, chart_frame=None):
         super(VTKChartWidget, self).__init__()
         vtk.vtkObject.GlobalWarningDisplayOff()
 
@@ -62,13 +102,51 @@ class VTKChartWidget(object):
         self.line_types = default_line_types
 
         self._gui_callbacks = []
+        self._data_callbacks = []
+        self._columns = []
+
+        # full resolution series and the decimated columns actually plotted
+        self._series = []
+        self._plot_columns = []
+        self._lod_range = None
+        self._lod_pending = False
+        # mouse state telling the zooms and pans of the user from the
+        # automatic scaling of the axes
+        self._buttons_down = 0
+        self._user_input_time = None
+        self._user_range = False
+
+        # series derived from the loaded ones, (source name, operation,
+        # parameters), plotted after them. Their results are memoized by
+        # version of the data, which changes whenever the data does
+        self.derived_specs = []
+        self.derived_cache = derived.DerivedCache(config.derived_cache_bytes)
+        # (name, message) of the derived series which could not be computed
+        self.derived_errors = []
+        self.n_source_series = 0
+
+        # capacity of the columns in streaming mode, None for unbounded
+        self.ring_capacity = None
+        self._buffers = []
+
+        self.storage = StoragePolicy.from_config(config)
+        # implicit X column of the table, when X is evenly spaced
+        self.x_column = None
+        self.x_name = 'x'
+        # names of the X column and of the plotted Y columns, None when
+        # several tables are overlaid
+        self.layout = None
 
         self.chart_frame = chart_frame
+        self.render_scheduler = RenderScheduler(self.render_now, config.max_fps)
 
         self.renderer = vtk.vtkRenderer()
         self.renderer.SetBackground(1.0, 1.0, 1.0)
 
         self.table = vtk.vtkTable()
+        # tables of the files overlaid on the chart, each with its own X
+        # column, table is the first one
+        self.tables = [self.table]
         self.chart = vtk.vtkChartXY()
         self.chart_scene = vtk.vtkContextScene()
         self.chart_actor = vtk.vtkContextActor()
@@ -90,6 +168,27 @@ class VTKChartWidget(object):
         title_prop = self.chart.GetTitleProperties()
         title_prop.SetFontSize(20)
 
+        # the plotted data is updated when the user zooms or pans
+        for axis in (vtk.vtkAxis.BOTTOM, vtk.vtkAxis.LEFT):
+            self.chart.GetAxis(axis).AddObserver(vtk.vtkChart.UpdateRange, self.on_axis_range_changed)
+
+        # scatter mode: markers, or a density image of the visible window
+        # when it holds more than marker_points points
+        self.scatter_mode = False
+        self.marker_points = config.scatter_marker_points
+        self._density = None
+        self._density_range = None
+        self.set_up_density_plot()
+
+        # Y axis fitted to the data of the visible X range on zoom and pan
+        self.fit_y_enabled = False
+
+        # hover readout of the values of the series nearest to the mouse
+        self.cursor_enabled = False
+        self.cursor_values = []
+        self._cursors = None
+        self.set_up_cursor_actors()
+
         self.init_xy_data()
         self.set_up_view()
 
@@ -102,25 +201,31 @@ class VTKChartWidget(object):
         options_dict['y_max'] = self.chart.GetAxis(1).GetMaximum()
 
         lines_options = []
-        for i in range(self.chart.GetNumberOfPlots()):
+        lines_names = []
+        for i in range(self.n_series_plots):
             line = self.chart.GetPlot(i)
+            lines_names.append(line.GetLabel() or 'Serie {0:d}'.format(i + 1))
             rgb = [0.0, 0.0, 0.0]
             line.GetColor(rgb)
             width = line.GetWidth()
             line_type = line.GetPen().GetLineType()
             lines_options.append((rgb, width, line_type))
         options_dict['lines_options'] =  lines_options
+        options_dict['lines_names'] = lines_names
 
         return options_dict
 
     def apply_options(self, options_dict):
+        # limits set by the user are kept when the data changes
+        self.chart.GetAxis(0).SetBehavior(vtk.vtkAxis.FIXED)
+        self.chart.GetAxis(1).SetBehavior(vtk.vtkAxis.FIXED)
         self.chart.GetAxis(0).SetMinimum(options_dict['x_min'])
         self.chart.GetAxis(0).SetMaximum(options_dict['x_max'])
         self.chart.GetAxis(1).SetMinimum(options_dict['y_min'])
         self.chart.GetAxis(1).SetMaximum(options_dict['y_max'])
 
         lines_options = options_dict['lines_options']
-        for i in range(self.chart.GetNumberOfPlots()):
+        for i in range(self.n_series_plots):
             rgb = lines_options[i][0]
             width = lines_options[i][1]
             line_type = lines_options[i][2]
@@ -138,17 +243,50 @@ class VTKChartWidget(object):
             width = line.SetWidth(width)
             line_type = line.GetPen().SetLineType(line_type)
             lines_options.append((rgb, width, line_type))
-            self.render()
+        self.render()
+
+    @property
+    def n_series_plots(self):
+        # the density plot, when shown, comes after the plots of the series
+        n_plots = self.chart.GetNumberOfPlots()
+        return n_plots - 1 if self.chart.GetPlotIndex(self.density_plot) >= 0 else n_plots
+
+    def add_series_plot(self, var_index):
+        '''
+        Adds the plot of the series var_index, a line or markers in scatter
+        mode, with the default style of its index.
+        '''
+        plot_type = vtk.vtkChart.POINTS if self.scatter_mode else vtk.vtkChart.LINE
+        line = self.chart.AddPlot(plot_type)
+        _index = var_index % len(self.line_colors)
+        line.SetColor(*self.line_colors[_index])
+        line.GetPen().SetLineType(self.line_types[_index])
+        line.SetWidth(self.line_width[_index])
+        return line
 
     def add_callback(self, callback):
         if callable(callback):
             self._gui_callbacks.append(callback)
 
+    def add_data_callback(self, callback):
+        '''
+        Registers a callback fired when the values of the columns change
+        without the series changing, e.g. when rows are appended.
+        '''
+        if callable(callback):
+            self._data_callbacks.append(callback)
+
+    def data_changed(self):
+        with tracer.span('data_callbacks'):
+            for callback in self._data_callbacks:
+                callback()
+
     def refresh_gui(method):
-        def wrapper(self, *args):
-            method(self, *args)
-            for i in range(len(self._gui_callbacks)):
-                self._gui_callbacks[i]()
+        def wrapper(self, *args, **kwargs):
+            method(self, *args, **kwargs)
+            with tracer.span('gui_callbacks'):
+                for i in range(len(self._gui_callbacks)):
+                    self._gui_callbacks[i]()
         return wrapper
 
     def init_xy_data(self):
@@ -157,86 +295,834 @@ class VTKChartWidget(object):
         self.chart.AddPlot(vtk.vtkChart.LINE)
 
     def set_up_view(self):
+        if self.chart_frame is None:
+            # headless chart, used by benchmarks
+            self.interactor = None
+            self.iren = None
+            self.render_window = vtk.vtkRenderWindow()
+            self.render_window.SetOffScreenRendering(1)
+            self.render_window.SetSize(*offscreen_size)
+            self.render_window.AddRenderer(self.renderer)
+            return
         self.interactor = QVTKRenderWindowInteractor(self.chart_frame)
-        self.interactor.GetRenderWindow().AddRenderer(self.renderer)
+        self.render_window = self.interactor.GetRenderWindow()
+        self.render_window.AddRenderer(self.renderer)
         self.chart_frame.layout().addWidget(self.interactor, 1, 0, 1, 1)
-        self.iren = self.interactor.GetRenderWindow().GetInteractor()
+        self.iren = self.render_window.GetInteractor()
+        self.iren.AddObserver('MouseMoveEvent', self.on_mouse_move)
+        self.iren.AddObserver('LeaveEvent', self.on_mouse_leave)
+        for button in ('Left', 'Middle', 'Right'):
+            self.iren.AddObserver(button + 'ButtonPressEvent', self.on_button_press)
+            self.iren.AddObserver(button + 'ButtonReleaseEvent', self.on_button_release)
+        self.iren.AddObserver('MouseWheelForwardEvent', self.on_user_input)
+        self.iren.AddObserver('MouseWheelBackwardEvent', self.on_user_input)
 
     @refresh_gui
-    def set_xy_data(self, x_array, y_array, title):
+    @tracer.traced('set_xy_data')
+    def set_xy_data(self, x_array, y_array, title, pyramids=None, names=('x', 'y'), stored=False):
+        '''
+        Plots y_array against x_array. Columns are vtk arrays or numpy
+        arrays, shared with the table without copy; names are the names of
+        numpy columns. stored tells that the storage policy was already
+        applied to the columns, e.g. by the loading thread.
+        '''
         if not title:
             title = 'N/A'
         self.chart.SetTitle(title)
         self.chart.ClearPlots()
 
-        self.table = vtk.vtkTable()
+        x_array, (y_array, ) = self.set_table(x_array, [y_array], names, stored)
 
-        self.table.AddColumn(x_array)
-        self.table.AddColumn(y_array)
+        self.chart.GetAxis(1).SetTitle(self.x_name)
+        self.chart.GetAxis(0).SetTitle(y_array.GetName())
 
-        line = self.chart.AddPlot(vtk.vtkChart.LINE)
+        self.set_series(x_array, [y_array], pyramids)
+        for var_index in range(len(self._series)):
+            self.add_series_plot(var_index)
+        self.update_decimation()
 
-        self.chart.GetAxis(1).SetTitle(x_array.GetName())
-        self.chart.GetAxis(0).SetTitle(y_array.GetName())
+        self.set_active()
 
-        line.SetInputData(self.table, 0, 1)
+        self.render()
 
-        line.SetColor(*self.line_colors[0])
-        line.SetWidth(self.line_width[0])
-        line.GetPen().SetLineType(self.line_types[0])
+    @refresh_gui
+    @tracer.traced('set_multiple_xy_data')
+    def set_multiple_xy_data(self, x_array, y_arrays_list, title, pyramids=None, names=None, stored=False):
+        '''
+        Plots each column of y_arrays_list against x_array. Columns are vtk
+        arrays or numpy arrays, shared with the table without copy; names
+        are the names of numpy columns, x first. stored is the one of
+        set_xy_data.
+        '''
+        if names is None:
+            names = ['x'] + ['y{0:d}'.format(i + 1) for i in range(len(y_arrays_list))]
+        if not title:
+            title = 'N/A'
+        self.chart.SetTitle(title)
+        self.chart.ClearPlots()
+
+        x_array, y_arrays_list = self.set_table(x_array, y_arrays_list, names, stored)
+        self.chart.GetAxis(0).SetTitle('')
+        self.chart.GetAxis(1).SetTitle(self.x_name)
+
+        self.set_series(x_array, y_arrays_list, pyramids)
+        for var_index in range(len(self._series)):
+            self.add_series_plot(var_index)
+        self.update_decimation()
 
         self.set_active()
+        self.render()
+
+    def update_data(self, x_array, y_arrays_list, title, pyramids=None, names=None, stored=False):
+        '''
+        Plots the columns like set_xy_data or set_multiple_xy_data. When the
+        series are the plotted ones (same number and names) the data of the
+        plots is replaced in place instead: plots, their styles and the gui
+        are left as they are.
+        '''
+        if names is None:
+            names = ['x'] + ['y{0:d}'.format(i + 1) for i in range(len(y_arrays_list))]
+        columns_names = [_values_and_name(column, name)[1]
+                         for column, name in zip([x_array] + list(y_arrays_list), names)]
+        layout = (columns_names[0], tuple(columns_names[1:]))
+        if layout == self.layout and self.n_series_plots == len(self._series):
+            self.replace_data(x_array, y_arrays_list, title, pyramids, names, stored)
+        elif len(y_arrays_list) == 1:
+            self.set_xy_data(x_array, y_arrays_list[0], title, pyramids, names, stored)
+        else:
+            self.set_multiple_xy_data(x_array, y_arrays_list, title, pyramids, names, stored)
 
+    @tracer.traced('replace_data')
+    def replace_data(self, x_array, y_arrays_list, title=None, pyramids=None, names=None, stored=False):
+        '''
+        Replaces the columns plotted by the existing plots, which must be
+        as many as the Y columns and the derived series. A zoomed chart
+        keeps its zoom.
+        '''
+        if names is None:
+            names = ['x'] + ['y{0:d}'.format(i + 1) for i in range(len(y_arrays_list))]
+        if title:
+            self.chart.SetTitle(title)
+        x_array, y_arrays_list = self.set_table(x_array, y_arrays_list, names, stored)
+        series_list = self.make_series(x_array, y_arrays_list, pyramids)
+        self._series = series_list + self.compute_derived(series_list)
+        self.n_source_series = len(series_list)
+        self._buffers = []
+        self.reset_cursors()
+
+        x_axis = self.chart.GetAxis(vtk.vtkAxis.BOTTOM)
+        if x_axis.GetBehavior() == vtk.vtkAxis.AUTO:
+            self.update_decimation()
+            self.chart.RecalculateBounds()
+        else:
+            self.update_decimation((x_axis.GetMinimum(), x_axis.GetMaximum()))
         self.render()
+        self.data_changed()
 
     @refresh_gui
-    def set_multiple_xy_data(self, x_array, y_arrays_list, title):
+    @tracer.traced('set_overlay_data')
+    def set_overlay_data(self, datasets, title):
+        '''
+        Overlays the series of several tables on the chart. datasets is a
+        list of (label, x_array, y_arrays_list, pyramids) tuples; each table
+        keeps its own X column, nothing is resampled on a common X.
+        '''
         if not title:
             title = 'N/A'
         self.chart.SetTitle(title)
         self.chart.ClearPlots()
         self.chart.GetAxis(0).SetTitle('')
-        self.chart.GetAxis(1).SetTitle(x_array.GetName())
+        self.chart.GetAxis(1).SetTitle(datasets[0][1].GetName() if datasets else '')
+
+        self.tables = []
+        self._columns = []
+        self.x_column = None
+        self.layout = None
+        series_list = []
+        for label, x_array, y_arrays_list, pyramids in datasets:
+            table = vtk.vtkTable()
+            table.AddColumn(x_array)
+            for y_array in y_arrays_list:
+                table.AddColumn(y_array)
+            self.tables.append(table)
+            self._columns += [x_array] + list(y_arrays_list)
+            series_list += self.make_series(x_array, y_arrays_list, pyramids, label)
+        self.table = self.tables[0] if self.tables else vtk.vtkTable()
+        self.x_name = self.chart.GetAxis(1).GetTitle()
+
+        self.show_series(series_list)
+        for var_index in range(len(self._series)):
+            self.add_series_plot(var_index)
+        self.update_decimation()
+
+        self.set_active()
+        self.render()
+
+    def set_table(self, x_array, y_arrays_list, names, stored=False):
+        '''
+        Builds the full resolution table of the columns, given as numpy or
+        vtk arrays, stored as chosen by the storage policy unless stored is
+        True. An implicit X column is kept in x_column, out of the table.
+        Returns the X column, a vtk array or a storage.UniformColumn, and
+        the vtk Y columns.
+        '''
+        x_values, self.x_name = _values_and_name(x_array, names[0])
+        x_stored = x_values if stored else self.storage.store_x(x_values)
+        if isinstance(x_stored, UniformColumn):
+            self.x_column = x_stored
+        else:
+            self.x_column = None
+            if x_stored is not x_values or isinstance(x_array, np.ndarray):
+                x_array = data_bridge.as_vtk_column(x_stored, self.x_name)
+
+        y_arrays = []
+        for y_array, name in zip(y_arrays_list, names[1:]):
+            y_values, y_name = _values_and_name(y_array, name)
+            y_stored = y_values if stored else self.storage.store_y(y_values)
+            if y_stored is not y_values or isinstance(y_array, np.ndarray):
+                y_array = data_bridge.as_vtk_column(y_stored, y_name)
+            y_arrays.append(y_array)
 
         self.table = vtk.vtkTable()
+        self.tables = [self.table]
+        self._columns = list(y_arrays)
+        if self.x_column is None:
+            self._columns.insert(0, x_array)
+        for column in self._columns:
+            self.table.AddColumn(column)
+        self.layout = (self.x_name, tuple(y_array.GetName() for y_array in y_arrays))
+        return (x_stored if self.x_column is not None else x_array), y_arrays
 
-        self.table.AddColumn(x_array)
-        for var_index, y_array in enumerate(y_arrays_list):
-            self.table.AddColumn(y_array)
-            line = self.chart.AddPlot(vtk.vtkChart.LINE)
-            line.SetInputData(self.table, 0, var_index + 1)
+    def materialize_x(self):
+        '''
+        Replaces the implicit X column by an actual column of the table,
+        e.g. before rows are appended.
+        '''
+        if self.x_column is None:
+            return
+        x_array = data_bridge.as_vtk_column(self.x_column[:], self.x_name)
+        table = vtk.vtkTable()
+        table.AddColumn(x_array)
+        for i in range(self.table.GetNumberOfColumns()):
+            table.AddColumn(self.table.GetColumn(i))
+        self.table = table
+        self.tables = [table]
+        self._columns.insert(0, x_array)
+        self.x_column = None
 
-            _index = var_index % len(self.line_colors)
-            color_rgb = self.line_colors[_index]
+    def memory_report(self):
+        '''
+        List of (name, storage, bytes) of the columns of the table.
+        '''
+        return memory_report(*self.get_columns())
 
-            line.SetColor(*color_rgb)
-            line.GetPen().SetLineType(self.line_types[_index])
-            line.SetWidth(self.line_width[_index])
+    def make_series(self, x_array, y_arrays_list, pyramids=None, label=None):
+        '''
+        Returns the full resolution series of the columns y_arrays_list
+        plotted against x_array. pyramids is the optional list of the
+        pyramid.MinMaxPyramid of the columns, x_array first. label prefixes
+        the names of the series in the legend. Only the pyramids of the Y
+        columns are kept: the one of X is not used by the decimation and
+        would keep the parsed X column alive, e.g. when X is implicit. The
+        sortedness of X and the extrema of Y are read from the pyramids,
+        the columns are only scanned when there are none.
+        '''
+        pyramids = pyramids or []
+        previous = dict((series.names[1], series) for series in self.source_series)
+        x_values, x_name = _values_and_name(x_array, self.x_name)
+        x_sorted = pyramids[0].sorted if pyramids else None
+        if x_sorted is None:
+            x_sorted = isinstance(x_values, UniformColumn) or is_sorted(x_values)
+        series_list = []
+        for i, y_array in enumerate(y_arrays_list):
+            y_values = data_bridge.to_numpy(y_array)
+            y_pyramid = pyramids[i + 1] if len(pyramids) > i + 1 else None
+            if y_pyramid is not None:
+                # the indices of a pyramid hold for the stored copy of the
+                # column, e.g. float32, the parsed column is not kept alive
+                y_pyramid.values = y_values
+            series = DecimatedSeries(x_values, y_values, x_sorted, y_pyramid)
+            y_name = y_array.GetName()
+            if label:
+                y_name = '{0}: {1}'.format(label, y_name)
+            series.names = (x_name, y_name)
+            if y_name in previous:
+                # derived series memoized for unchanged columns still hold
+                series.keep_version(previous[y_name])
+            series_list.append(series)
+        return series_list
 
-        self.set_active()
-        self.render()
+    def set_series(self, x_array, y_arrays_list, pyramids=None):
+        '''
+        Creates the full resolution series plotted against x_array. pyramids
+        is the optional list of the pyramid.MinMaxPyramid of the columns
+        of the table, x_array first.
+        '''
+        self.show_series(self.make_series(x_array, y_arrays_list, pyramids))
 
-    def get_values_as_table(self):
+    def show_series(self, series_list):
+        '''
+        Shows the series and the series derived from them.
+        '''
+        self._series = series_list + self.compute_derived(series_list)
+        self.n_source_series = len(series_list)
+        self._buffers = []
+        self.reset_cursors()
+
+        # new data is shown entirely
+        self.chart.GetAxis(vtk.vtkAxis.LEFT).SetBehavior(vtk.vtkAxis.AUTO)
+        self.chart.GetAxis(vtk.vtkAxis.BOTTOM).SetBehavior(vtk.vtkAxis.AUTO)
+        self._lod_range = None
+
+    @tracer.traced('append_rows')
+    def append_rows(self, x_values, y_values_list):
+        '''
+        Appends rows to the columns of the current table in place. With
+        ring_capacity set, the oldest rows are evicted to keep at most
+        ring_capacity rows. Gui callbacks are only fired when the number
+        of series changes, data callbacks are fired otherwise.
+        '''
+        self.materialize_x()
         n_columns = self.table.GetNumberOfColumns()
-        if not n_columns:
-            return []
+        if len(self.tables) > 1 or n_columns != len(y_values_list) + 1:
+            self.reset_streaming_columns(x_values, y_values_list)
+            return
 
-        n_rows = self.table.GetColumn(0).GetNumberOfTuples()
-        if not n_rows:
-            return []
+        if not self._buffers:
+            self._buffers = []
+            for i in range(n_columns):
+                values = data_bridge.to_numpy(self.table.GetColumn(i))
+                self._buffers.append(ColumnBuffer(values, self.ring_capacity, values.dtype))
+
+        x_tail = self._buffers[0].values[-1:]
+        x_values = np.asarray(x_values, dtype=np.float64)
+        x_sorted = (self._series[0].x_sorted if self._series else True) and is_sorted(x_values) and \
+            (not len(x_tail) or not len(x_values) or x_values[0] >= x_tail[0])
+
+        for i, new_values in enumerate([x_values] + list(y_values_list)):
+            buffer = self._buffers[i]
+            buffer.append(new_values)
+            data_bridge.repoint(self.table.GetColumn(i), buffer.values)
+        self._columns = [self.table.GetColumn(i) for i in range(n_columns)]
+        self.table.Modified()
+
+        x_values = self._buffers[0].values
+        source_series = self.source_series
+        for i, series in enumerate(source_series):
+            series.set_values(x_values, self._buffers[i + 1].values, x_sorted)
+        self._series = source_series + self.compute_derived(source_series)
+        self.update_cursors()
+
+        x_axis = self.chart.GetAxis(vtk.vtkAxis.BOTTOM)
+        if x_axis.GetBehavior() == vtk.vtkAxis.AUTO:
+            self.update_decimation()
+            self.chart.RecalculateBounds()
+        else:
+            self.update_decimation(self._lod_range)
+        self.render()
+        self.data_changed()
+
+    def reset_streaming_columns(self, x_values, y_values_list):
+        first = -self.ring_capacity if self.ring_capacity else 0
+        x_values = np.array(x_values[first:], dtype=np.float64)
+        y_values_list = [np.array(y_values[first:], dtype=np.float64) for y_values in y_values_list]
+        self.set_multiple_xy_data(x_values, y_values_list, self.chart.GetTitle())
 
-        column_names = []
-        for i in range(n_columns):
-            column_names.append(self.table.GetColumn(i).GetName())
+    @property
+    def source_series(self):
+        return self._series[:self.n_source_series]
+
+    @property
+    def source_names(self):
+        return [series.names[1] for series in self.source_series]
+
+    @property
+    def derived_names(self):
+        return [derived.derived_name(operation, source_name, params)
+                for source_name, operation, params in self.derived_specs]
+
+    def compute_derived(self, series_list):
+        '''
+        Returns the derived series of the specs whose source is one of
+        series_list, computed only when they are not memoized for the
+        current version of the values of their source. The series which
+        can not be computed are left out and reported in derived_errors.
+        '''
+        # results of replaced values are never asked again and can hold the
+        # replaced X columns, the results of the other series are kept
+        versions = set((series.names[1], series.version) for series in series_list)
+        self.derived_cache.retain(lambda key: key[:2] in versions)
+        sources = dict((series.names[1], series) for series in series_list)
+        derived_series = []
+        self.derived_errors = []
+        for source_name, operation, params in self.derived_specs:
+            source = sources.get(source_name)
+            if source is None or not len(source):
+                continue
+            key = (source_name, source.version, operation, derived.params_key(params))
+            try:
+                with tracer.span('derived'):
+                    x_values, y_values = self.derived_cache.get(
+                        key, lambda: derived.compute(operation, source.x, source.y, **params))
+            except ValueError as e:
+                self.derived_errors.append((derived.derived_name(operation, source_name, params), str(e)))
+                continue
+            x_sorted = True if operation == 'fft' else source.x_sorted
+            series = DecimatedSeries(x_values, y_values, x_sorted)
+            x_name = 'frequence' if operation == 'fft' else source.names[0]
+            series.names = (x_name, derived.derived_name(operation, source_name, params))
+            derived_series.append(series)
+        return derived_series
+
+    def add_derived_series(self, source_name, operation, **params):
+        '''
+        Plots the series derived from the series source_name by operation,
+        a key of derived.operations, e.g. add_derived_series('y1',
+        'moving_average', window=50).
+        '''
+        spec = (source_name, operation, params)
+        if spec not in self.derived_specs:
+            self.derived_specs.append(spec)
+        self.update_derived()
+
+    def remove_derived_series(self, index):
+        del self.derived_specs[index]
+        self.update_derived()
+
+    def update_derived(self):
+        source_series = self.source_series
+        self._series = source_series + self.compute_derived(source_series)
+        self.reset_cursors()
+        self.rebuild_plots()
+
+    @property
+    def series_x_bounds(self):
+        bounds = [s.x_bounds for s in self._series if len(s)]
+        if not bounds:
+            return None
+        return min(b[0] for b in bounds), max(b[1] for b in bounds)
+
+    @property
+    def lod_buckets(self):
+        return max(self.renderer.GetSize()[0], default_lod_buckets)
+
+    @tracer.traced('decimation')
+    def update_decimation(self, x_range=None):
+        '''
+        Replaces the data of each plot by its full resolution series
+        decimated for x_range, the whole series when x_range is None.
+        '''
+        if x_range is None:
+            x_range = self.series_x_bounds
+        if x_range is None:
+            return
+        self._lod_range = x_range
+        if self.scatter_mode:
+            self.update_density(x_range)
+            return
+        n_buckets = self.lod_buckets
+
+        self._plot_columns = []
+        for i, series in enumerate(self._series):
+            x_values, y_values = series.decimate(x_range[0], x_range[1], n_buckets)
+            x_array = data_bridge.as_vtk_column(x_values, series.names[0])
+            y_array = data_bridge.as_vtk_column(y_values, series.names[1])
+            plot_table = vtk.vtkTable()
+            plot_table.AddColumn(x_array)
+            plot_table.AddColumn(y_array)
+            self._plot_columns.append((x_array, y_array))
+            self.chart.GetPlot(i).SetInputData(plot_table, 0, 1)
+
+    def on_button_press(self, obj, event):
+        self._buttons_down += 1
+        self.on_user_input(obj, event)
 
-        table_values = [column_names, ]
-        for i in range(n_rows):
-            cur_row = []
-            for j in range(n_columns):
-                column = self.table.GetColumn(j)
-                cur_row.append(column.GetValue(i))
-            table_values.append(cur_row)
-        return table_values
+    def on_button_release(self, obj, event):
+        self._buttons_down = max(self._buttons_down - 1, 0)
+        self.on_user_input(obj, event)
+
+    def on_user_input(self, obj, event):
+        self._user_input_time = time.time()
+
+    @property
+    def user_input(self):
+        '''
+        True while a mouse button is down or shortly after a mouse event,
+        when a change of the axes comes from a zoom or a pan.
+        '''
+        return bool(self._buttons_down) or (self._user_input_time is not None and
+                                             time.time() - self._user_input_time < user_input_delay)
+
+    def on_axis_range_changed(self, obj, event):
+        # the axes also change when they are scaled to new data, only the
+        # changes made by the user pin them
+        if self.user_input:
+            self._user_range = True
+        # the decimation is deferred out of the chart painting
+        if not self._lod_pending:
+            self._lod_pending = True
+            QtCore.QTimer.singleShot(0, self.refresh_decimation)
+
+    def refresh_decimation(self):
+        self._lod_pending = False
+        user_range = self._user_range
+        self._user_range = False
+        x_axis = self.chart.GetAxis(vtk.vtkAxis.BOTTOM)
+        y_axis = self.chart.GetAxis(vtk.vtkAxis.LEFT)
+        x_range = (x_axis.GetMinimum(), x_axis.GetMaximum())
+        y_range = (y_axis.GetMinimum(), y_axis.GetMaximum())
+        if not self._series:
+            return
+        if user_range:
+            # axes are fixed so that the chart keeps the zoom when the
+            # plotted data is replaced. Automatic scaling only re-decimates
+            # and the axes keep following the data
+            x_axis.SetBehavior(vtk.vtkAxis.FIXED)
+            y_axis.SetBehavior(vtk.vtkAxis.FIXED)
+        # the lines only depend on the X range, the density on both ranges
+        if self.scatter_mode:
+            if (x_range, y_range) == self._density_range:
+                return
+        elif x_range == self._lod_range:
+            return
+        if user_range and self.fit_y_enabled:
+            self.fit_y(x_range)
+        self.update_decimation(x_range)
+        self.render()
+
+    def set_up_density_plot(self):
+        # image of the bin counts, the scalars are shared with numpy
+        self.density_image = vtk.vtkImageData()
+        self.density_values = None
+        self.density_colors = vtk.vtkLookupTable()
+        self.density_colors.SetScaleToLog10()
+        self.density_colors.SetHueRange(0.667, 0.0)
+        self.density_colors.SetNanColor(1.0, 1.0, 1.0, 0.0)
+        self.density_colors.SetTableRange(1.0, 10.0)
+        self.density_colors.Build()
+        self.density_plot = vtk.vtkPlotHistogram2D()
+        self.density_plot.SetInputData(self.density_image)
+        self.density_plot.SetTransferFunction(self.density_colors)
+
+    def set_scatter_mode(self, enabled):
+        '''
+        Draws the series as markers, or as a density image when the visible
+        window holds more than marker_points points, instead of lines.
+        '''
+        if enabled == self.scatter_mode:
+            return
+        self.scatter_mode = enabled
+        self.rebuild_plots()
+
+    @refresh_gui
+    def rebuild_plots(self):
+        '''
+        Recreates the plots of the series, e.g. after the plot type or the
+        number of series changed.
+        '''
+        self._density = None
+        self._density_range = None
+        self.chart.ClearPlots()
+        for var_index in range(len(self._series)):
+            self.add_series_plot(var_index)
+        x_axis = self.chart.GetAxis(vtk.vtkAxis.BOTTOM)
+        if x_axis.GetBehavior() == vtk.vtkAxis.AUTO:
+            self.update_decimation()
+            self.chart.RecalculateBounds()
+        else:
+            self.update_decimation((x_axis.GetMinimum(), x_axis.GetMaximum()))
+        self.render()
+
+    def density_shape(self):
+        '''
+        Shape (rows, columns) of the histogram, one bin per pixel of the
+        plot area.
+        '''
+        (left, bottom, right, top), _, _ = self.plot_area()
+        if right - left < 1 or top - bottom < 1:
+            # not drawn yet, the plot area is not known
+            width, height = self.renderer.GetSize()
+            if width < 1 or height < 1:
+                width, height = offscreen_size
+            return max(int(height), 1), max(int(width), 1)
+        return int(top - bottom), int(right - left)
+
+    @tracer.traced('density')
+    def update_density(self, x_range):
+        '''
+        Starts the binning of the points of the window x_range and of the
+        fixed Y range, or of the full Y range of the series. The binning
+        goes on over the next iterations of the event loop.
+        '''
+        y_axis = self.chart.GetAxis(vtk.vtkAxis.LEFT)
+        if y_axis.GetBehavior() == vtk.vtkAxis.FIXED:
+            y_range = (y_axis.GetMinimum(), y_axis.GetMaximum())
+        else:
+            y_range = self.visible_y_range(x_range)
+        if y_range is None:
+            return
+        if x_range[0] == x_range[1]:
+            x_range = (x_range[0] - 0.5, x_range[1] + 0.5)
+        if y_range[0] == y_range[1]:
+            y_range = (y_range[0] - 0.5, y_range[1] + 0.5)
+        self._density_range = (tuple(x_range), tuple(y_range))
+        self._density = DensityBinning(self._series, x_range, y_range, self.density_shape(),
+                                       self.marker_points, config.density_chunk_size)
+        self.step_density(self._density)
+
+    def step_density(self, binning):
+        if binning is not self._density:
+            # replaced by the binning of a newer window
+            return
+        if self.chart_frame is None:
+            # headless chart, the binning is done at once
+            binning.run()
+        else:
+            binning.run(config.density_step_seconds)
+        if binning.done and binning.markers is not None:
+            self.show_markers(binning)
+        else:
+            self.show_density(binning)
+        if not binning.done:
+            QtCore.QTimer.singleShot(0, lambda: self.step_density(binning))
+        self.render()
+
+    def show_markers(self, binning):
+        self._plot_columns = []
+        for i, series in enumerate(self._series):
+            indices = binning.marker_indices(i)
+            x_array = data_bridge.as_vtk_column(np.asarray(series.x[indices], dtype=np.float64),
+                                                series.names[0])
+            y_array = data_bridge.as_vtk_column(series.y[indices], series.names[1])
+            plot_table = vtk.vtkTable()
+            plot_table.AddColumn(x_array)
+            plot_table.AddColumn(y_array)
+            self._plot_columns.append((x_array, y_array))
+            plot = self.chart.GetPlot(i)
+            plot.SetInputData(plot_table, 0, 1)
+            plot.SetVisible(True)
+        self.density_plot.SetVisible(False)
+
+    def show_density(self, binning):
+        n_rows, n_columns = binning.shape
+        if self.density_values is None or self.density_values.shape != binning.counts.shape:
+            self.density_values = np.empty_like(binning.counts)
+            self.density_image.SetDimensions(n_columns, n_rows, 1)
+            self.density_image.GetPointData().SetScalars(
+                data_bridge.as_vtk_column(self.density_values, 'density'))
+        binning.image_values(self.density_values)
+        # points of the image at the centers of the bins
+        x_step = (binning.x_range[1] - binning.x_range[0]) / float(n_columns)
+        y_step = (binning.y_range[1] - binning.y_range[0]) / float(n_rows)
+        self.density_image.SetSpacing(x_step, y_step, 1.0)
+        self.density_image.SetOrigin(binning.x_range[0] + x_step / 2.0,
+                                     binning.y_range[0] + y_step / 2.0, 0.0)
+        self.density_image.GetPointData().GetScalars().Modified()
+        self.density_image.Modified()
+        max_count = float(binning.counts.max()) if len(binning.counts) else 0.0
+        self.density_colors.SetTableRange(1.0, max(max_count, 10.0))
+
+        for i in range(len(self._series)):
+            self.chart.GetPlot(i).SetVisible(False)
+        if self.chart.GetPlotIndex(self.density_plot) < 0:
+            self.chart.AddPlot(self.density_plot)
+        self.density_plot.SetVisible(True)
+        self.density_plot.Update()
+
+    def visible_y_range(self, x_range=None):
+        '''
+        Minimum and maximum of the series over x_range, the range of the X
+        axis by default, from the min/max index of each series.
+        '''
+        if x_range is None:
+            x_axis = self.chart.GetAxis(vtk.vtkAxis.BOTTOM)
+            x_range = (x_axis.GetMinimum(), x_axis.GetMaximum())
+        y_min = y_max = None
+        for series in self._series:
+            y_range = series.y_range(*x_range)
+            if y_range is None:
+                continue
+            y_min = y_range[0] if y_min is None else min(y_min, y_range[0])
+            y_max = y_range[1] if y_max is None else max(y_max, y_range[1])
+        if y_min is None:
+            return None
+        return y_min, y_max
+
+    @tracer.traced('fit_y')
+    def fit_y(self, x_range=None, margin=0.05):
+        y_range = self.visible_y_range(x_range)
+        if y_range is None:
+            return
+        span = y_range[1] - y_range[0]
+        padding = margin * span if span else margin * abs(y_range[0]) or 1.0
+        y_axis = self.chart.GetAxis(vtk.vtkAxis.LEFT)
+        y_axis.SetBehavior(vtk.vtkAxis.FIXED)
+        y_axis.SetRange(y_range[0] - padding, y_range[1] + padding)
+
+    def set_fit_y(self, enabled):
+        self.fit_y_enabled = enabled
+        if enabled and self._series:
+            self.fit_y()
+            self.render()
+
+    def set_up_cursor_actors(self):
+        # crosshair and readout drawn over the chart in display coordinates
+        self.cursor_points = vtk.vtkPoints()
+        self.cursor_points.SetNumberOfPoints(4)
+        lines = vtk.vtkCellArray()
+        for first in (0, 2):
+            lines.InsertNextCell(2)
+            lines.InsertCellPoint(first)
+            lines.InsertCellPoint(first + 1)
+        crosshair = vtk.vtkPolyData()
+        crosshair.SetPoints(self.cursor_points)
+        crosshair.SetLines(lines)
+        mapper = vtk.vtkPolyDataMapper2D()
+        mapper.SetInputData(crosshair)
+        self.cursor_crosshair = vtk.vtkActor2D()
+        self.cursor_crosshair.SetMapper(mapper)
+        self.cursor_crosshair.GetProperty().SetColor(0.5, 0.5, 0.5)
+        self.cursor_crosshair.VisibilityOff()
+
+        self.cursor_text = vtk.vtkTextActor()
+        text_prop = self.cursor_text.GetTextProperty()
+        text_prop.SetFontSize(14)
+        text_prop.SetColor(0, 0, 0)
+        text_prop.SetBackgroundColor(1, 1, 1)
+        text_prop.SetBackgroundOpacity(0.8)
+        self.cursor_text.VisibilityOff()
+
+        self.renderer.AddActor(self.cursor_crosshair)
+        self.renderer.AddActor(self.cursor_text)
+
+    def set_cursor_enabled(self, enabled):
+        self.cursor_enabled = enabled
+        if enabled:
+            self.prepare_cursors()
+        else:
+            self.hide_cursor()
+
+    def reset_cursors(self):
+        self._cursors = None
+        if self.cursor_enabled:
+            self.prepare_cursors()
+
+    def update_cursors(self):
+        '''
+        Updates the cursor lookups after the values of the series changed,
+        e.g. when rows were appended, their indices are rebuilt without
+        piling up builds.
+        '''
+        if self._cursors is None or len(self._cursors) != len(self._series):
+            self.reset_cursors()
+            return
+        for cursor, series in zip(self._cursors, self._series):
+            cursor.set_series(series)
+
+    def prepare_cursors(self):
+        '''
+        Builds the cursor lookups of the series shown, the indices of the
+        series with unsorted X are built in background threads.
+        '''
+        if self._cursors is None:
+            self._cursors = [SeriesCursor(series, background=True) for series in self._series]
+
+    def hide_cursor(self):
+        if self.cursor_crosshair.GetVisibility():
+            self.cursor_crosshair.VisibilityOff()
+            self.cursor_text.VisibilityOff()
+            self.render()
+
+    def on_mouse_move(self, obj, event):
+        if self.cursor_enabled:
+            self.update_cursor(*self.iren.GetEventPosition())
+
+    def on_mouse_leave(self, obj, event):
+        self.hide_cursor()
+
+    def plot_area(self):
+        '''
+        Returns the display coordinates (left, bottom, right, top) of the
+        plot area and the ranges of the X and Y axes.
+        '''
+        x_axis = self.chart.GetAxis(vtk.vtkAxis.BOTTOM)
+        y_axis = self.chart.GetAxis(vtk.vtkAxis.LEFT)
+        left, bottom = x_axis.GetPoint1()
+        right = x_axis.GetPoint2()[0]
+        top = y_axis.GetPoint2()[1]
+        x_range = (x_axis.GetMinimum(), x_axis.GetMaximum())
+        y_range = (y_axis.GetMinimum(), y_axis.GetMaximum())
+        return (left, bottom, right, top), x_range, y_range
+
+    def cursor_lookup(self, x_value, y_value=None, scales=(1.0, 1.0)):
+        '''
+        Returns the (name, x, y) of the point of each series nearest to the
+        cursor: nearest along X for series with sorted X, nearest on screen
+        for the other ones. Series whose index is being built are left out.
+        '''
+        self.prepare_cursors()
+        values = []
+        for cursor in self._cursors:
+            point = cursor.nearest(x_value, y_value, scales)
+            if point is not None:
+                values.append((cursor.series.names[1], ) + point)
+        return values
+
+    @tracer.traced('cursor')
+    def update_cursor(self, x_pixel, y_pixel, max_reported=10):
+        (left, bottom, right, top), x_range, y_range = self.plot_area()
+        inside = left <= x_pixel <= right and bottom <= y_pixel <= top
+        if not inside or not self._series or right <= left or top <= bottom:
+            self.cursor_values = []
+            self.hide_cursor()
+            return
+        x_scale = (x_range[1] - x_range[0]) / (right - left)
+        y_scale = (y_range[1] - y_range[0]) / (top - bottom)
+        x_value = x_range[0] + (x_pixel - left) * x_scale
+        y_value = y_range[0] + (y_pixel - bottom) * y_scale
+        # distances on screen, in pixels
+        self.cursor_values = self.cursor_lookup(x_value, y_value, (x_scale or 1.0, y_scale or 1.0))
+
+        self.cursor_points.SetPoint(0, x_pixel, bottom, 0)
+        self.cursor_points.SetPoint(1, x_pixel, top, 0)
+        self.cursor_points.SetPoint(2, left, y_pixel, 0)
+        self.cursor_points.SetPoint(3, right, y_pixel, 0)
+        self.cursor_points.Modified()
+
+        lines = ['x = {0:.6g}'.format(x_value)]
+        for name, x, y in self.cursor_values[:max_reported]:
+            lines.append('{0}: {1:.6g}, {2:.6g}'.format(name, x, y))
+        if len(self.cursor_values) > max_reported:
+            lines.append('...')
+        self.cursor_text.SetInput('\n'.join(lines))
+        # the readout stays on the side of the plot area center
+        text_prop = self.cursor_text.GetTextProperty()
+        if x_pixel > (left + right) / 2.0:
+            text_prop.SetJustificationToRight()
+            self.cursor_text.SetPosition(x_pixel - 10, y_pixel + 10)
+        else:
+            text_prop.SetJustificationToLeft()
+            self.cursor_text.SetPosition(x_pixel + 10, y_pixel + 10)
+        self.cursor_crosshair.VisibilityOn()
+        self.cursor_text.VisibilityOn()
+        self.render()
+
+    def get_columns(self):
+        '''
+        Returns the names and the numpy views, without copy, of the columns
+        of the full resolution table, the first one of overlaid tables.
+        '''
+        names, columns = data_bridge.table_columns(self.table)
+        if self.x_column is not None:
+            names.insert(0, self.x_name)
+            columns.insert(0, self.x_column)
+        return names, columns
+
+    def get_values_as_table(self):
+        names, columns = self.get_columns()
+        if not columns or not len(columns[0]):
+            return []
+        return [names, ] + np.column_stack(columns).tolist()
 
     @property
     def is_visible(self):
@@ -249,7 +1135,19 @@ class VTKChartWidget(object):
         self.chart_frame.hide()
 
     def set_active(self):
-        self.chart_frame.set_active()
+        if self.chart_frame is not None:
+            self.chart_frame.set_active()
 
     def render(self):
-        self.interactor.GetRenderWindow().Render()
+        '''
+        Requests a frame, the requests are coalesced by the render scheduler.
+        '''
+        self.render_scheduler.request()
+
+    @tracer.traced('render')
+    def render_now(self):
+        self.render_window.Render()
+
+    @property
+    def frame_statistics(self):
+        return self.render_scheduler.statistics
@@ -0,0 +1,51 @@
+'''
+Tests of the Y ranges and extrema of decimated series holding NaN values.
+'''
+
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'source'))
+
+from decimation import DecimatedSeries, minmax_indices
+
+
+class TestDecimationNaN(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.x = np.arange(1000, dtype=np.float64)
+        self.y = rng.randn(1000)
+        self.y[10] = np.nan
+        self.y[600:700] = np.nan
+
+    def test_y_range(self):
+        series = DecimatedSeries(self.x, self.y)
+        self.assertEqual(series.y_range(0, 999), (np.nanmin(self.y), np.nanmax(self.y)))
+        self.assertEqual(series.y_range(5, 300), (np.nanmin(self.y[5:301]), np.nanmax(self.y[5:301])))
+        self.assertIsNone(series.y_range(610, 690))
+
+    def test_y_range_unsorted_x(self):
+        series = DecimatedSeries(self.x[::-1], self.y)
+        self.assertEqual(series.y_range(0, 999), (np.nanmin(self.y), np.nanmax(self.y)))
+
+    def test_extent_indices(self):
+        series = DecimatedSeries(self.x, self.y)
+        extent = series.extent_indices
+        self.assertIn(np.nanargmin(self.y), extent)
+        self.assertIn(np.nanargmax(self.y), extent)
+
+    def test_minmax_indices(self):
+        indices = minmax_indices(self.y, 0, 1000, 10)
+        buckets = self.y[:1000].reshape(10, 100)
+        self.assertFalse(np.isnan(self.y[indices[:12]]).any())
+        self.assertEqual(self.y[indices[:2]].min(), np.nanmin(buckets[0]))
+        self.assertEqual(self.y[indices[:2]].max(), np.nanmax(buckets[0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
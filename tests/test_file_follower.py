@@ -0,0 +1,79 @@
+'''
+Tests of the follow mode of growing csv files: rows cut in the middle of
+their writing are parsed once complete.
+'''
+
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'source'))
+
+import csv_loader
+
+try:
+    from ui_file_follower import TailParser
+except ImportError:
+    TailParser = None
+
+
+def load_complete_lines(file_path):
+    parts = [part for part, _, _ in csv_loader.iter_parse_csv(file_path, complete_lines=True)]
+    parsed = parts[0] if len(parts) == 1 else csv_loader.concatenate_parsed(parts)
+    parsed.n_bytes = csv_loader.complete_lines_end(file_path)
+    return parsed
+
+
+class TestFollowCutRow(unittest.TestCase):
+
+    def setUp(self):
+        self.dir_path = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.dir_path, 'followed.csv')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir_path)
+
+    def write(self, data, mode='wb'):
+        with open(self.file_path, mode) as f:
+            f.write(data)
+
+    def test_load_stops_at_last_newline(self):
+        self.write(b'1,2\n3,4')
+        parsed = load_complete_lines(self.file_path)
+        self.assertEqual([list(c) for c in parsed.columns], [[1.0], [2.0]])
+        self.assertEqual(parsed.n_bytes, 4)
+        self.assertEqual(parsed.n_lines, 1)
+
+    def test_load_without_newline(self):
+        self.write(b'1,2')
+        parsed = load_complete_lines(self.file_path)
+        self.assertEqual(parsed.n_rows, 0)
+        self.assertEqual(parsed.n_bytes, 0)
+
+    @unittest.skipIf(TailParser is None, 'PyQt4 is needed by the follow mode')
+    def test_row_completed_after_load(self):
+        self.write(b'1,2\n3,4')
+        parsed = load_complete_lines(self.file_path)
+        tail = TailParser(self.file_path, parsed.n_bytes, 2, b',', parsed.n_lines)
+        self.write(b'5\n6,7\nbad\n', 'ab')
+        appended = tail.read_new_rows()
+        self.assertEqual([list(c) for c in appended.columns], [[3.0, 6.0], [45.0, 7.0]])
+        # bad rows are numbered from the start of the file
+        self.assertEqual(list(appended.bad_rows), [3])
+
+    @unittest.skipIf(TailParser is None, 'PyQt4 is needed by the follow mode')
+    def test_row_cut_while_following(self):
+        self.write(b'1,2\n')
+        tail = TailParser(self.file_path, 4, 2, b',', 1)
+        self.write(b'3,', 'ab')
+        self.assertIsNone(tail.read_new_rows())
+        self.write(b'4\n', 'ab')
+        appended = tail.read_new_rows()
+        self.assertEqual([list(c) for c in appended.columns], [[3.0], [4.0]])
+
+
+if __name__ == '__main__':
+    unittest.main()
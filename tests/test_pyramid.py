@@ -0,0 +1,61 @@
+'''
+Tests of the min/max pyramid of a column holding NaN values.
+'''
+
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'source'))
+
+from pyramid import MinMaxPyramid
+
+
+def reference_extrema(values, first, last):
+    chunk = values[first:last]
+    if np.isnan(chunk).all():
+        return None
+    return np.nanmin(chunk), np.nanmax(chunk)
+
+
+class TestPyramidNaN(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.values = rng.randn(1000)
+        self.values[10] = np.nan
+        self.values[500:700] = np.nan
+        self.values[-3:] = np.nan
+        self.pyramid = MinMaxPyramid.build(self.values, base_block=16)
+
+    def check_range(self, first, last):
+        i_min, i_max = self.pyramid.range_extrema(first, last)
+        expected = reference_extrema(self.values, first, last)
+        if expected is None:
+            self.assertTrue(np.isnan(self.values[i_min]) and np.isnan(self.values[i_max]))
+        else:
+            self.assertEqual((self.values[i_min], self.values[i_max]), expected)
+
+    def test_extrema_ignore_nan(self):
+        i_min, i_max = self.pyramid.extrema
+        self.assertEqual(self.values[i_min], np.nanmin(self.values))
+        self.assertEqual(self.values[i_max], np.nanmax(self.values))
+
+    def test_block_with_one_nan(self):
+        i_min, i_max = self.pyramid.levels[0][0][0], self.pyramid.levels[0][1][0]
+        self.assertEqual((self.values[i_min], self.values[i_max]), reference_extrema(self.values, 0, 16))
+
+    def test_ranges(self):
+        for first, last in [(0, 1000), (5, 15), (3, 517), (500, 700), (510, 690), (650, 999), (997, 1000)]:
+            self.check_range(first, last)
+
+    def test_windows_skip_nan(self):
+        indices = self.pyramid.window_indices(0, 500, 8)
+        self.assertFalse(np.isnan(self.values[indices]).any())
+
+
+if __name__ == '__main__':
+    unittest.main()